@@ -0,0 +1,50 @@
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def generate(path, lines, distinct, seed=0):
+    # 物品出现次数大致按 Zipf 分布，大小写随机
+    rng = random.Random(seed)
+    items = [f"item{i}" for i in range(distinct)]
+    weights = [1 / (i + 1) for i in range(distinct)]
+    with open(path, "w") as f:
+        for batch in range(0, lines, 100_000):
+            chosen = rng.choices(items, weights, k=min(100_000, lines - batch))
+            f.write("".join((w.upper() if rng.random() < 0.5 else w) + "\n" for w in chosen))
+
+def run(args, path):
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        output = subprocess.run([sys.executable, os.path.join(HERE, "grocery.py")] + args,
+                                stdin=f, capture_output=True, check=True).stdout
+    return time.perf_counter() - start, output
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="grocery.py 原来的逐行版本与分块多进程版本的对比")
+    parser.add_argument("--lines", type=int, default=5_000_000)
+    parser.add_argument("--distinct", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "items.txt")
+        generate(path, args.lines, args.distinct)
+        size = os.path.getsize(path) / 1e6
+        print(f"{args.lines:,} 行, {args.distinct:,} 种物品, {size:.0f} MB")
+
+        base_time, expected = run([], path)
+        print(f"{'逐行 input()':24s} {base_time:6.2f} s")
+        cases = [("分块 1 进程", [path, "--workers", "1"]),
+                 (f"分块 {os.cpu_count()} 进程", [path]),
+                 ("标准输入分块", ["-"]),
+                 ("top 10 精确", [path, "--top", "10"]),
+                 ("top 10 sketch", [path, "--top", "10", "--sketch"])]
+        for label, case in cases:
+            elapsed, output = run(case, path)
+            same = "" if "--top" in case else ("  输出一致" if output == expected else "  输出不一致!")
+            print(f"{label:24s} {elapsed:6.2f} s  {base_time / elapsed:5.1f}x{same}")
@@ -0,0 +1,56 @@
+import argparse
+import io
+import random
+import time
+
+from taqueria import menu, run_batch
+
+def typo(name, rng):
+    # 随机改大小写、删掉或交换一个字母、只写前缀
+    roll = rng.random()
+    if roll < 0.6:
+        return name if rng.random() < 0.5 else name.upper()
+    if roll < 0.75 and len(name) > 4:
+        i = rng.randrange(1, len(name) - 1)
+        return name[:i] + name[i + 1:]
+    if roll < 0.9 and len(name) > 4:
+        i = rng.randrange(1, len(name) - 2)
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name.lower()[:max(4, len(name) - 3)]
+
+def generate_orders(count, seed=0, max_items=6):
+    rng = random.Random(seed)
+    names = list(menu)
+    lines = []
+    for _ in range(count):
+        items = []
+        for _ in range(rng.randint(1, max_items)):
+            item = typo(rng.choice(names), rng)
+            items.append(f"{rng.randint(2, 4)} {item}" if rng.random() < 0.2 else item)
+        lines.append(", ".join(items) + "\n")
+    return lines
+
+def baseline(lines, out):
+    # 原来的做法：逐个物品 .title() 查字典，浮点数累加
+    start = time.perf_counter()
+    for number, line in enumerate(lines, 1):
+        total = 0
+        for item in line.split(","):
+            item = item.strip().title()
+            if item in menu:
+                total += menu[item]
+        out.write(f"{number}\t${total:.2f}\n")
+    return len(lines), time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量计价的吞吐量")
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    lines = generate_orders(args.orders)
+    print(f"生成 {args.orders:,} 个订单: {time.perf_counter() - start:.1f} s")
+    for label, function in (("逐个 .title() + 浮点", baseline), ("索引 + 整数分", run_batch)):
+        out = io.StringIO()
+        orders, elapsed = function(lines, out)
+        print(f"{label:14s} {elapsed:6.2f} s, {orders / elapsed:12,.0f} 订单/s")
@@ -1,13 +1,198 @@
-dic = {}
-while True:
-    try:
-        item = input().upper()
-        if item in dic:
-            dic[item] += 1
+import argparse
+import hashlib
+import heapq
+import os
+import sys
+from array import array
+from collections import Counter, deque
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNK_SIZE = 16 << 20  # 每次读 16MB
+UNIVERSAL_NEWLINES = sys.platform == "win32"  # 只有 Windows 上的 sys.stdin 会转换 \r 和 \r\n
+
+def interactive():
+    # 原来的逐行版本：不带参数运行时使用
+    dic = {}
+    while True:
+        try:
+            item = input().upper()
+            if item in dic:
+                dic[item] += 1
+            else:
+                dic[item] = 1
+        except EOFError:
+            break
+
+    for i in dic:
+        print(dic[i], i)
+
+def count_text(data):
+    # 一块完整的行（bytes），和 input().upper() 一样统计，每行一个物品。
+    # 切行方式和 sys.stdin 一致：Windows 上 \r\n 和单独的 \r 都算换行，其他平台只认 \n，
+    # \r 留在物品名里（splitlines() 还会在 \x0c 等字符处断开，和 input() 不一样）
+    text = data.decode()
+    if UNIVERSAL_NEWLINES and "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    items = text.upper().split("\n")
+    items.pop()  # 块以换行结尾，最后一个是空串
+    return Counter(items)
+
+def read_chunks(f, start=0, end=None, chunk_size=CHUNK_SIZE):
+    # 读出 [start, end) 范围内的数据，每块都在换行处截断，末尾没有换行的行补上换行
+    if start:
+        f.seek(start)
+    rest = b""
+    remaining = None if end is None else end - start
+    while remaining is None or remaining > 0:
+        data = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+        if not data:
+            break
+        if remaining is not None:
+            remaining -= len(data)
+        data = rest + data
+        cut = data.rfind(b"\n") + 1
+        rest = data[cut:]
+        if cut:
+            yield data[:cut]
+    if rest:
+        yield rest + b"\n"
+
+class CountMinSketch:
+    """count-min sketch：depth 行 width 列的计数，估计值只会偏大；两个同样大小的可以直接相加"""
+    def __init__(self, width=1 << 16, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = array("q", bytes(8 * width * depth))
+
+    def indices(self, item):
+        # 一次哈希得到两个值，再组合出每一行的列号
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, item, count=1):
+        table = self.table
+        for i in self.indices(item):
+            table[i] += count
+
+    def estimate(self, item):
+        table = self.table
+        return min(table[i] for i in self.indices(item))
+
+    def merge(self, other):
+        table = self.table
+        for i, value in enumerate(other.table):
+            table[i] += value
+
+def sketch_chunks(chunks, candidates_size):
+    # 逐块精确计数后并入 sketch，只保留估计值最大的 candidates_size 个候选，内存与不同物品数无关
+    sketch = CountMinSketch()
+    candidates = {}
+    for chunk in chunks:
+        counts = count_text(chunk)
+        for item, count in counts.items():
+            sketch.add(item, count)
+        for item in counts:
+            candidates[item] = sketch.estimate(item)
+        if len(candidates) > candidates_size:
+            candidates = dict(heapq.nlargest(candidates_size, candidates.items(), key=lambda kv: kv[1]))
+    return sketch, list(candidates)
+
+def count_range(path, start, end, top=None):
+    with open(path, "rb") as f:
+        chunks = read_chunks(f, start, end)
+        if top:
+            return sketch_chunks(chunks, 10 * top)
+        counts = Counter()
+        for chunk in chunks:
+            counts.update(count_text(chunk))
+        return counts
+
+def split_file(path, parts):
+    # 按字节均分，再把每个分界点挪到下一行的开头
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, parts):
+            f.seek(size * i // parts)
+            f.readline()
+            bounds.append(max(bounds[-1], min(f.tell(), size)))
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+def ordered_map(pool, function, items, window):
+    # 和 pool.map 一样按顺序返回结果，但最多 window 个任务在途，不会先把输入全部读进来
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(function, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def count_file(path, workers, top=None):
+    """多进程统计文件（"-" 表示标准输入）。
+
+    文件按行切成 workers 段，每个进程自己打开文件读自己那一段；标准输入由主进程按块读，
+    再分给进程池。返回 Counter，按物品第一次出现的顺序排列；top 不为空时返回
+    (合并后的 sketch, 候选物品列表)。
+    """
+    with ProcessPoolExecutor(workers) as pool:
+        if path == "-":
+            chunks = read_chunks(sys.stdin.buffer)
+            if top:
+                function, chunks = partial(sketch_chunks, candidates_size=10 * top), ([c] for c in chunks)
+            else:
+                function = count_text
+            parts = ordered_map(pool, function, chunks, 2 * workers)
         else:
-            dic[item] = 1
-    except EOFError:
-        break
-    
-for i in dic:
-    print(dic[i], i)
\ No newline at end of file
+            ranges = split_file(path, workers)
+            parts = pool.map(count_range, [path] * len(ranges), *zip(*ranges), [top] * len(ranges))
+        if top:
+            sketch, candidates = CountMinSketch(), set()
+            for part_sketch, part_candidates in parts:
+                sketch.merge(part_sketch)
+                candidates.update(part_candidates)
+            return sketch, candidates
+        counts = Counter()
+        for part in parts:
+            counts.update(part)
+        return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="统计每种物品出现的次数")
+    parser.add_argument("path", nargs="?", help='物品清单文件，"-" 表示标准输入；不给则逐行交互输入')
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--sort", choices=["input", "name", "count"], default="input",
+                        help="输出顺序：首次出现、物品名、次数从多到少")
+    parser.add_argument("--top", type=int, help="只输出次数最多的 K 个")
+    parser.add_argument("--sketch", action="store_true",
+                        help="配合 --top：用 count-min sketch 近似计数，内存不随物品种类增长")
+    args = parser.parse_args()
+
+    if args.path is None:
+        interactive()
+        return
+    if args.sketch and not args.top:
+        parser.error("--sketch 需要同时给出 --top")
+
+    if args.sketch:
+        sketch, candidates = count_file(args.path, args.workers, args.top)
+        rows = sorted(((sketch.estimate(item), item) for item in candidates), key=lambda row: (-row[0], row[1]))
+        rows = rows[:args.top]
+    else:
+        counts = count_file(args.path, args.workers)
+        if args.top:
+            rows = [(count, item) for item, count in counts.most_common(args.top)]
+        elif args.sort == "name":
+            rows = [(count, item) for item, count in sorted(counts.items())]
+        elif args.sort == "count":
+            rows = sorted(((count, item) for item, count in counts.items()), key=lambda row: (-row[0], row[1]))
+        else:
+            rows = [(count, item) for item, count in counts.items()]
+    sys.stdout.write("".join(f"{count} {item}\n" for count, item in rows))
+
+if __name__ == "__main__":
+    main()
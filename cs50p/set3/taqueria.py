@@ -1,3 +1,9 @@
+import argparse
+import difflib
+import sys
+import time
+from functools import lru_cache
+
 menu = {
     "Baja Taco": 4.25,
     "Burrito": 7.50,
@@ -9,13 +15,136 @@ menu = {
     "Taco": 3.00,
     "Tortilla Salad": 8.00
 }
-total = 0
-while True:
-    try:
-        item = input("Item: ").title()
-        if item not in menu:
-            continue
-        total += menu[item]
-        print(f"Total: ${total:.2f}")
-    except EOFError:
-        break
\ No newline at end of file
+
+BUFFER_LINES = 10_000  # 批量模式每攒这么多行输出写一次
+
+def normalize(name):
+    # 忽略大小写和多余空格
+    return " ".join(name.lower().split())
+
+def dollars(cents):
+    return f"${cents // 100}.{cents % 100:02d}"
+
+class MenuIndex:
+    """把 menu 编译成查找表，价格用整数分。
+
+    查找顺序：规范化后的全名 -> 唯一的前缀（至少 min_prefix 个字符，如 "super b"）
+    -> 拼写相近的菜名（difflib，相似度不低于 cutoff）。模糊匹配的结果有缓存，
+    同样的错别字只算一次。找不到返回 None。
+    """
+    def __init__(self, menu, min_prefix=3, cutoff=0.8):
+        self.cents = {normalize(name): round(price * 100) for name, price in menu.items()}
+        self.names = list(self.cents)
+        self.cutoff = cutoff
+        prefixes = {}
+        for name in self.names:
+            for i in range(min_prefix, len(name)):
+                prefixes.setdefault(name[:i], set()).add(name)
+        self.exact = dict(self.cents)
+        for prefix, names in prefixes.items():
+            if len(names) == 1 and prefix not in self.exact:
+                self.exact[prefix] = self.cents[names.pop()]
+        self.fuzzy = lru_cache(maxsize=1 << 16)(self._fuzzy)
+
+    def _fuzzy(self, key):
+        match = difflib.get_close_matches(key, self.names, n=1, cutoff=self.cutoff)
+        return self.cents[match[0]] if match else None
+
+    def price(self, item):
+        key = normalize(item)
+        cents = self.exact.get(key)
+        if cents is None and key:
+            cents = self.fuzzy(key)
+        return cents
+
+    def price_part(self, part):
+        # 订单里的一项，前面可以写数量，如 "2 taco"
+        count, _, rest = part.partition(" ")
+        if count.isdigit() and rest:
+            cents = self.price(rest)
+            return None if cents is None else int(count) * cents
+        return self.price(part)
+
+def price_orders(lines, index, cache_size=1 << 16):
+    """逐行计价，一行一个订单，物品之间用逗号分隔。产生 (订单号, 总价（分）, 无法识别的物品数)
+
+    同样写法的物品反复出现，所以按原样的文本缓存价格，命中时只查一次字典；
+    缓存满了就清空，避免乱写的物品让它无限增长。
+    """
+    price_part = index.price_part
+    cache = {}
+    for number, line in enumerate(lines, 1):
+        total = 0
+        unknown = 0
+        for part in line.split(","):
+            part = part.strip()
+            if part in cache:
+                cents = cache[part]
+            elif not part:
+                continue
+            else:
+                if len(cache) >= cache_size:
+                    cache.clear()
+                cents = cache[part] = price_part(part)
+            if cents is None:
+                unknown += 1
+            else:
+                total += cents
+        yield number, total, unknown
+
+def format_orders(priced):
+    # 订单号、总价，有无法识别的物品时再加一列个数
+    for number, total, unknown in priced:
+        if unknown:
+            yield f"{number}\t{dollars(total)}\t{unknown}\n"
+        else:
+            yield f"{number}\t{dollars(total)}\n"
+
+def write_buffered(lines, out, buffer_lines=BUFFER_LINES):
+    # 攒够 buffer_lines 行再写，返回写出的行数
+    written = 0
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= buffer_lines:
+            out.write("".join(buffer))
+            written += len(buffer)
+            buffer.clear()
+    out.write("".join(buffer))
+    return written + len(buffer)
+
+def run_batch(lines, out, index=None):
+    """生成器流水线：读入 -> 计价 -> 格式化 -> 缓冲写出，返回 (订单数, 用时)"""
+    index = index or MenuIndex(menu)
+    start = time.perf_counter()
+    orders = write_buffered(format_orders(price_orders(lines, index)), out)
+    return orders, time.perf_counter() - start
+
+def interactive():
+    # 原来的交互模式，价格改用整数分累加
+    cents_by_name = {normalize(name): round(price * 100) for name, price in menu.items()}
+    total = 0
+    while True:
+        try:
+            item = input("Item: ")
+            cents = cents_by_name.get(normalize(item))
+            if cents is None:
+                continue
+            total += cents
+            print(f"Total: {dollars(total)}")
+        except EOFError:
+            break
+
+def main():
+    parser = argparse.ArgumentParser(description="Felipe's Taqueria 点餐计价")
+    parser.add_argument("orders", nargs="?", help='订单文件，每行一个订单，"-" 表示标准输入；不给则交互点餐')
+    args = parser.parse_args()
+    if args.orders is None:
+        interactive()
+        return
+    with (sys.stdin if args.orders == "-" else open(args.orders)) as f:
+        orders, elapsed = run_batch(f, sys.stdout)
+    print(f"{orders} 个订单, {elapsed:.2f} s, {orders / elapsed if elapsed else 0:,.0f} 订单/s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import random
+import time
+from collections import deque
+from itertools import islice
+
+from snake_core import DIRECTIONS, ShapeDetector
+
+# 形状检测的微基准：原来每步重建坐标列表的 check_s_shape 对比 ShapeDetector 查表
+TICKS = 200000
+
+def legacy_check_s_shape(positions):
+    # 原 Snake.check_s_shape 的判定部分
+    if len(positions) < 7:
+        return False
+    segments = list(islice(positions, 7))
+    x_coords = [p[0] for p in segments]
+    y_coords = [p[1] for p in segments]
+    if (x_coords[0] == x_coords[1] == x_coords[2] and
+        x_coords[3] == x_coords[4] and
+        x_coords[5] == x_coords[6] and
+        abs(x_coords[0] - x_coords[3]) == 1 and
+        abs(x_coords[3] - x_coords[5]) == 1 and
+        y_coords[0] == y_coords[1] and
+        y_coords[1] != y_coords[2] and
+        y_coords[2] == y_coords[3] == y_coords[4] and
+        y_coords[4] != y_coords[5] and
+        y_coords[5] == y_coords[6]):
+        return True
+    if (y_coords[0] == y_coords[1] == y_coords[2] and
+        y_coords[3] == y_coords[4] and
+        y_coords[5] == y_coords[6] and
+        abs(y_coords[0] - y_coords[3]) == 1 and
+        abs(y_coords[3] - y_coords[5]) == 1 and
+        x_coords[0] == x_coords[1] and
+        x_coords[1] != x_coords[2] and
+        x_coords[2] == x_coords[3] == x_coords[4] and
+        x_coords[4] != x_coords[5] and
+        x_coords[5] == x_coords[6]):
+        return True
+    return False
+
+def random_walk(n):
+    # 随机但不掉头的移动序列
+    rng = random.Random(0)
+    moves = []
+    direction = DIRECTIONS[0]
+    for _ in range(n):
+        choices = [d for d in DIRECTIONS if d != (-direction[0], -direction[1])]
+        direction = rng.choice(choices)
+        moves.append(direction)
+    return moves
+
+if __name__ == "__main__":
+    moves = random_walk(TICKS)
+
+    positions = deque([(0, 0)], maxlen=10)
+    start = time.perf_counter()
+    for dx, dy in moves:
+        x, y = positions[0]
+        positions.appendleft((x + dx, y + dy))
+        legacy_check_s_shape(positions)
+    legacy = time.perf_counter() - start
+
+    detector = ShapeDetector()
+    positions = deque([(0, 0)], maxlen=10)
+    hits = 0
+    start = time.perf_counter()
+    for dx, dy in moves:
+        x, y = positions[0]
+        positions.appendleft((x + dx, y + dy))
+        if detector.push((dx, dy)) is not None:
+            hits += 1
+    table = time.perf_counter() - start
+
+    print(f"check_s_shape: {legacy / TICKS * 1e9:8.0f} ns/tick")
+    print(f"ShapeDetector: {table / TICKS * 1e9:8.0f} ns/tick ({hits} 次命中)")
@@ -0,0 +1,25 @@
+import time
+
+from snake_core import Snake, RIGHT
+
+# Snake.move 吞吐量随蛇长的变化：蛇在一条足够长的环形跑道上向右直行，不会撞到自己
+LENGTHS = [3, 10, 100, 1000, 10000]
+TICKS = 200000
+
+def bench(length):
+    snake = Snake(width=length * 2 + 10, height=1)
+    snake.direction = RIGHT
+    snake.grow_to = length
+    while len(snake.positions) < length:
+        snake.move()
+
+    start = time.perf_counter()
+    for _ in range(TICKS):
+        snake.move()
+    elapsed = time.perf_counter() - start
+    assert len(snake.positions) == length
+    return TICKS / elapsed
+
+if __name__ == "__main__":
+    for length in LENGTHS:
+        print(f"长度 {length:6d}: {bench(length):12,.0f} ticks/s")
@@ -0,0 +1,269 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion
+
+from chat_cache import CompletionCache, request_key
+from chat_mock_server import MockConfig, start_mock_server
+
+DEFAULT_BASE_URL = "https://api.deepseek.com"
+DEFAULT_MODEL = "deepseek-chat"
+SYSTEM_PROMPT = "You are a helpful assistant"
+
+class TokenBucket:
+    """令牌桶限速：平均每秒 rate 个请求，空闲时最多攒 capacity 个。等待的请求按先来后到放行"""
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def make_client(base_url, api_key, concurrency, timeout=60.0):
+    """所有请求共用一个 httpx 连接池；SDK 自带的重试关掉，由 call_with_retry 处理"""
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        timeout=timeout)
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0, http_client=http_client)
+
+def build_request(item, model):
+    # 输入的每行是 {"id": ..., "messages": [...]} 或 {"id": ..., "prompt": "..."}
+    messages = item.get("messages") or [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": item["prompt"]},
+    ]
+    return {"model": item.get("model", model), "messages": messages, **item.get("params", {})}
+
+def retry_delay(error, attempt, base=0.5, cap=30.0):
+    # 服务器给了 Retry-After 就按它来（不超过 cap），否则指数退避加全抖动
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return min(cap, max(0.0, float(response.headers.get("retry-after"))))
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def retryable(error):
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True  # APITimeoutError 是 APIConnectionError 的子类
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+async def call_with_retry(client, request, bucket=None, max_retries=5):
+    """发一次请求，遇到 429、5xx 和连接错误时退避重试；返回 (响应, 尝试次数)"""
+    attempt = 0
+    while True:
+        if bucket is not None:
+            await bucket.acquire()
+        try:
+            return await client.chat.completions.create(**request), attempt + 1
+        except openai.APIError as e:
+            if attempt >= max_retries or not retryable(e):
+                raise
+            await asyncio.sleep(retry_delay(e, attempt))
+            attempt += 1
+
+async def cached_completion(client, request, cache=None, bucket=None, max_retries=5):
+    """先查缓存，未命中再请求并写入缓存；返回 (响应, 尝试次数)，命中时尝试次数为 0"""
+    if cache is None:
+        return await call_with_retry(client, request, bucket, max_retries)
+    key = request_key(request)
+    cached = await cache.aget(key)
+    if cached is not None:
+        return ChatCompletion.model_validate_json(cached), 0
+    response, attempts = await call_with_retry(client, request, bucket, max_retries)
+    await cache.aput(key, response.model_dump_json())
+    return response, attempts
+
+async def stream_completion(client, request, bucket=None, max_retries=5, on_token=None):
+    """流式请求：每收到一段内容就调用 on_token(text)，返回 (内容, 指标, 尝试次数)。
+
+    连接失败和收到内容之前断开的流都会重试（共用 max_retries）；已经收到部分内容后出错
+    则直接抛出，由调用方把这一条记为失败，避免 on_token 收到重复的内容。流在 async with
+    里读取，出错时连接也会关闭。指标里 ttft 是从开始到首个 token 的时间（包括重试等待），
+    latency 是总耗时；tokens 优先用服务器返回的 usage，否则按收到的内容块计数；
+    tokens_per_sec 只算首个 token 之后的生成速度。
+    """
+    start = time.perf_counter()
+    request = {**request, "stream": True, "stream_options": {"include_usage": True}}
+    attempts = 0
+    while True:
+        stream, tries = await call_with_retry(client, request, bucket, max_retries - attempts)
+        attempts += tries
+        first = None
+        parts = []
+        usage = None
+        try:
+            async with stream:
+                async for chunk in stream:
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    text = chunk.choices[0].delta.content
+                    if text:
+                        if first is None:
+                            first = time.perf_counter()
+                        parts.append(text)
+                        if on_token is not None:
+                            on_token(text)
+            break
+        except (openai.APIError, httpx.TransportError) as e:
+            if parts or attempts > max_retries or not (isinstance(e, httpx.TransportError) or retryable(e)):
+                raise
+            await asyncio.sleep(retry_delay(e, attempts - 1))
+    end = time.perf_counter()
+    first = first or end
+    tokens = usage.completion_tokens if usage is not None else len(parts)
+    metrics = {"ttft": first - start, "latency": end - start, "tokens": tokens,
+               "tokens_per_sec": (tokens - 1) / (end - first) if tokens > 1 and end > first else 0.0}
+    return "".join(parts), metrics, attempts
+
+def percentiles(values, quantiles=(50, 90, 99)):
+    values = sorted(values)
+    return [values[min(len(values) - 1, len(values) * q // 100)] for q in quantiles]
+
+def read_prompts(path):
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f):
+            if line.strip():
+                item = json.loads(line)
+                item.setdefault("id", number)
+                yield item
+
+async def run_batch(input_path, output_path, client, model=DEFAULT_MODEL, concurrency=32, rate=None,
+                    max_retries=5, stream=False, on_token=None, cache=None):
+    """把 input_path 里的提示词都跑一遍，按完成顺序写入 output_path，返回统计。
+
+    同时最多 concurrency 个请求在途：信号量在创建任务前获取，所以输入再多，
+    内存里也只有这么多任务。每行输出都带着输入的 id。stream=True 时用流式请求，
+    每段内容交给 on_token(id, text)，并在统计里收集每个请求的 ttft/latency/tokens_per_sec。
+    给了 cache（CompletionCache）时非流式请求先查缓存。
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    bucket = TokenBucket(rate) if rate else None
+    stats = {"ok": 0, "failed": 0, "retries": 0, "ttft": [], "latency": [], "tokens_per_sec": []}
+    tasks = set()
+
+    async def process(item, out):
+        start = time.perf_counter()
+        try:
+            request = build_request(item, model)
+            if stream:
+                callback = None if on_token is None else lambda text: on_token(item["id"], text)
+                content, metrics, attempts = await stream_completion(client, request, bucket, max_retries, callback)
+                result = {"id": item["id"], "content": content, **metrics, "attempts": attempts}
+                for key in ("ttft", "latency", "tokens_per_sec"):
+                    stats[key].append(metrics[key])
+            else:
+                response, attempts = await cached_completion(client, request, cache, bucket, max_retries)
+                result = {"id": item["id"], "content": response.choices[0].message.content,
+                          "usage": response.usage.model_dump() if response.usage else None, "attempts": attempts}
+            stats["ok"] += 1
+            stats["retries"] += max(0, attempts - 1)
+        except Exception as e:
+            # 单个请求的任何错误（输入格式不对、传输错误等）都只记为这一行失败，不影响整批
+            result = {"id": item["id"], "error": f"{type(e).__name__}: {e}"}
+            stats["failed"] += 1
+        finally:
+            semaphore.release()
+        result.setdefault("latency", time.perf_counter() - start)
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    with open(output_path, "w", encoding="utf-8") as out:
+        for item in read_prompts(input_path):
+            await semaphore.acquire()
+            task = asyncio.create_task(process(item, out))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+    return stats
+
+def write_sample_prompts(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({"id": f"q{i}", "prompt": f"Question number {i}"}) + "\n")
+
+async def main(args):
+    server = None
+    base_url, api_key = args.base_url, os.environ.get("DEEPSEEK_API_KEY")
+    if args.mock:
+        server = start_mock_server(MockConfig(args.mock_latency, rate_limit_rate=args.mock_429,
+                                              error_rate=args.mock_5xx, first_token_delay=args.mock_first_token,
+                                              token_delay=args.mock_token_delay, reply_words=args.mock_words))
+        base_url, api_key = server.base_url, "mock"
+    if args.generate:
+        write_sample_prompts(args.input, args.generate)
+
+    def echo(item_id, text):
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    cache = CompletionCache(args.cache, args.cache_ttl, bypass=args.refresh) if args.cache else None
+    client = make_client(base_url, api_key, args.concurrency)
+    start = time.perf_counter()
+    try:
+        stats = await run_batch(args.input, args.output, client, args.model, args.concurrency, args.rate,
+                                args.retries, args.stream, echo if args.echo else None, cache)
+    finally:
+        await client.close()
+        if cache is not None:
+            print(f"缓存: {cache.stats()}")
+            cache.close()
+    elapsed = time.perf_counter() - start
+    total = stats["ok"] + stats["failed"]
+    print(f"{total} 个请求: 成功 {stats['ok']}, 失败 {stats['failed']}, 重试 {stats['retries']} 次, "
+          f"用时 {elapsed:.2f} s ({total / elapsed:.1f} 请求/s)")
+    if stats["ttft"]:
+        print("          p50 / p90 / p99")
+        for key, label, scale, unit in (("ttft", "首个token", 1000, "ms"), ("latency", "总延迟", 1000, "ms"),
+                                        ("tokens_per_sec", "生成速度", 1, "tok/s")):
+            p50, p90, p99 = (v * scale for v in percentiles(stats[key]))
+            print(f"{label:8s} {p50:8.1f} / {p90:8.1f} / {p99:8.1f} {unit}")
+    if server is not None:
+        print(f"模拟服务器返回: {server.counts}")
+        server.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="并发批量调用 chat.completions")
+    parser.add_argument("input", help="JSONL，每行 {\"id\", \"prompt\"} 或 {\"id\", \"messages\"}")
+    parser.add_argument("output", help="结果 JSONL，按完成顺序写入")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rate", type=float, help="每秒最多发出的请求数（含重试）")
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--generate", type=int, default=0, help="先往 input 写入这么多条示例提示词")
+    parser.add_argument("--cache", help="SQLite 缓存文件，相同请求直接返回缓存结果（仅非流式）")
+    parser.add_argument("--cache-ttl", type=float, help="缓存有效期（秒）")
+    parser.add_argument("--refresh", action="store_true", help="不读缓存，重新请求并覆盖缓存")
+    parser.add_argument("--stream", action="store_true", help="流式请求，统计首个 token 时间和生成速度")
+    parser.add_argument("--echo", action="store_true", help="流式内容一到就写到标准输出（适合 --concurrency 1）")
+    parser.add_argument("--mock", action="store_true", help="启动本地模拟服务器并连接它")
+    parser.add_argument("--mock-latency", type=float, default=0.05)
+    parser.add_argument("--mock-429", type=float, default=0.05, help="模拟服务器返回 429 的比例")
+    parser.add_argument("--mock-5xx", type=float, default=0.02, help="模拟服务器返回 503 的比例")
+    parser.add_argument("--mock-first-token", type=float, default=0.2, help="模拟服务器流式回复的首个 token 延迟")
+    parser.add_argument("--mock-token-delay", type=float, default=0.02, help="模拟服务器流式回复每个 token 的间隔")
+    parser.add_argument("--mock-words", type=int, default=0, help="模拟服务器固定回复的词数，0 表示复述提示词")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,197 @@
+import argparse
+import asyncio
+import hashlib
+import http.client
+import json
+import multiprocessing as mp
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from chat_mock_server import MockConfig, start_mock_server
+
+# 不影响回复内容的字段，不参与缓存键
+IGNORED_FIELDS = {"stream", "stream_options", "timeout", "extra_headers"}
+
+def request_key(request):
+    """请求的规范化哈希：字段排序、紧凑 JSON、去掉 IGNORED_FIELDS，相同内容的请求得到相同的键"""
+    canonical = {k: v for k, v in request.items() if k not in IGNORED_FIELDS and v is not None}
+    data = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+class CompletionCache:
+    """SQLite 上的补全缓存，按 request_key 存回复的 JSON。
+
+    - ttl 秒后过期（None 表示不过期），条目超过 max_entries 时按最近访问时间淘汰。
+    - WAL 模式加 busy_timeout，多个进程各开一个连接同时读写是安全的。
+    - 命中时更新访问时间会带来一次写事务，所以先记在内存里，攒够 touch_batch 个
+      或者写入、关闭时再一起写回；多进程下 LRU 的顺序因此只是近似的。
+    - bypass=True 时不读缓存（都算未命中），但仍然写入新结果，用来强制刷新。
+    - 在 asyncio 里用 aget/aput：读写交给一个专用线程，别的进程持有写锁时不会卡住事件循环；
+      等锁超时（database is locked）当作未命中，写入失败就跳过。
+    """
+    def __init__(self, path, ttl=None, max_entries=100_000, bypass=False, touch_batch=256, evict_every=100):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.bypass = bypass
+        self.touch_batch = touch_batch
+        self.evict_every = evict_every
+        # 连接可能在 aget/aput 的专用线程里使用，所有访问都是串行的
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.executor = None
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS entries "
+                          "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self.touched = {}
+        self.puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def get(self, key):
+        if self.bypass:
+            self.misses += 1
+            return None
+        row = self.conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+            self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.expired += 1
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.touched[key] = now
+        if len(self.touched) >= self.touch_batch:
+            self.flush()
+        return row[0]
+
+    def put(self, key, value):
+        now = time.time()
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", (key, value, now, now))
+        self.puts += 1
+        if self.puts % self.evict_every == 0:
+            self.evict()
+
+    async def run(self, function, *args):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="completion-cache")
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def aget(self, key):
+        try:
+            return await self.run(self.get, key)
+        except sqlite3.OperationalError:
+            self.misses += 1
+            return None
+
+    async def aput(self, key, value):
+        try:
+            await self.run(self.put, key, value)
+        except sqlite3.OperationalError:
+            pass
+
+    def flush(self):
+        # 把攒下的访问时间写回，已被别的进程删掉的键直接忽略
+        if self.touched:
+            with self.conn:
+                self.conn.executemany("UPDATE entries SET accessed = ? WHERE key = ?",
+                                      [(t, k) for k, t in self.touched.items()])
+            self.touched.clear()
+
+    def evict(self):
+        self.flush()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.ttl is not None:
+                self.conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,))
+            (count,) = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            if count > self.max_entries:
+                self.conn.execute("DELETE FROM entries WHERE key IN "
+                                  "(SELECT key FROM entries ORDER BY accessed LIMIT ?)", (count - self.max_entries,))
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "expired": self.expired,
+                "hit_rate": self.hits / total if total else 0.0}
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _writer(path, worker, count, max_entries):
+    # 并发测试：每个进程写入自己的键并读回
+    with CompletionCache(path, max_entries=max_entries) as cache:
+        for i in range(count):
+            key = request_key({"model": "mock", "messages": [{"role": "user", "content": f"{worker}-{i}"}]})
+            cache.put(key, json.dumps({"worker": worker, "i": i}))
+            value = cache.get(key)
+            if value is not None and json.loads(value) != {"worker": worker, "i": i}:
+                raise RuntimeError("读回的内容不一致")
+
+def post(connection, request):
+    connection.request("POST", "/v1/chat/completions", json.dumps(request), {"Content-Type": "application/json"})
+    return connection.getresponse().read().decode()
+
+if __name__ == "__main__":
+    # 基准：经过模拟服务器的往返 vs 缓存命中，以及多进程同时写入
+    parser = argparse.ArgumentParser(description="补全缓存的基准测试")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟服务器的响应延迟")
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+
+    server = start_mock_server(MockConfig(latency=args.latency, jitter=0))
+    connection = http.client.HTTPConnection(*server.server_address)
+    requests = [{"model": "mock", "temperature": 0.7,
+                 "messages": [{"role": "user", "content": f"Question {i}"}]} for i in range(args.requests)]
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "cache.sqlite")
+        with CompletionCache(path) as cache:
+            for label in ("第一遍（未命中）", "第二遍（命中）"):
+                start = time.perf_counter()
+                for request in requests:
+                    key = request_key(request)
+                    value = cache.get(key)
+                    if value is None:
+                        value = post(connection, request)
+                        cache.put(key, value)
+                elapsed = time.perf_counter() - start
+                print(f"{label}: 每个请求 {elapsed / len(requests) * 1e6:10.1f} us")
+            print(f"命中统计: {cache.stats()}")
+
+        start = time.perf_counter()
+        per_process = 1000
+        processes = [mp.Process(target=_writer, args=(path, w, per_process, 1_000_000)) for w in range(args.processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+        ok = all(process.exitcode == 0 for process in processes)
+        with CompletionCache(path) as cache:
+            print(f"{args.processes} 个进程并发写入 {args.processes * per_process} 条: {elapsed:.2f} s, "
+                  f"{'全部成功' if ok else '有进程出错!'}, 缓存共 {len(cache)} 条")
+    server.shutdown()
@@ -0,0 +1,158 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class MockConfig:
+    """模拟服务器的行为：每个请求的延迟（秒），以及返回 429 和 5xx 的比例。
+
+    流式请求（"stream": true）等 first_token_delay 后发出第一个词，之后每个词间隔 token_delay；
+    reply_words 大于 0 时回复固定这么多个词，方便测吞吐量。
+    """
+    def __init__(self, latency=0.05, jitter=0.02, rate_limit_rate=0.0, error_rate=0.0, retry_after=0.1,
+                 first_token_delay=0.2, token_delay=0.02, reply_words=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.reply_words = reply_words
+
+def reply_text(request, reply_words=0):
+    # 回复内容：把最后一条用户消息复述一遍，或者固定 reply_words 个词
+    if reply_words:
+        return " ".join(f"word{i}" for i in range(reply_words))
+    messages = request.get("messages") or [{}]
+    return "Echo: " + str(messages[-1].get("content", ""))
+
+class MockHandler(BaseHTTPRequestHandler):
+    """OpenAI 兼容的 POST /v1/chat/completions"""
+    protocol_version = "HTTP/1.1"  # 保持连接，客户端的连接池可以复用
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=()):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in headers:
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+        config = server.config
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": "not found"}})
+            return
+        roll = random.random()
+        if roll < config.rate_limit_rate:
+            server.count(429)
+            self.send_json(429, {"error": {"message": "rate limited", "type": "rate_limit_error"}},
+                           [("Retry-After", str(config.retry_after))])
+            return
+        if roll < config.rate_limit_rate + config.error_rate:
+            server.count(503)
+            self.send_json(503, {"error": {"message": "overloaded", "type": "server_error"}})
+            return
+        content = reply_text(request, config.reply_words)
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+        completion_tokens = len(content.split())
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        base = {"id": f"chatcmpl-mock-{random.getrandbits(32):08x}", "created": int(time.time()),
+                "model": request.get("model", "mock")}
+        server.count(200)
+        if request.get("stream"):
+            self.stream(request, base, content.split(" "), usage)
+            return
+        time.sleep(max(0.0, config.latency + random.uniform(-config.jitter, config.jitter)))
+        self.send_json(200, {
+            **base,
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    def send_chunk(self, data):
+        # HTTP/1.1 分块传输，每个 SSE 事件一块，立即发出
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def send_event(self, payload):
+        self.send_chunk(b"data: " + (payload if isinstance(payload, bytes) else json.dumps(payload).encode()) + b"\n\n")
+
+    def stream(self, request, base, words, usage):
+        config = self.server.config
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        chunk = {**base, "object": "chat.completion.chunk"}
+        time.sleep(config.first_token_delay)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(config.token_delay)
+            delta = {"content": word if i == len(words) - 1 else word + " "}
+            if i == 0:
+                delta["role"] = "assistant"
+            self.send_event({**chunk, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+        self.send_event({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (request.get("stream_options") or {}).get("include_usage"):
+            self.send_event({**chunk, "choices": [], "usage": usage})
+        self.send_event(b"[DONE]")
+        self.send_chunk(b"")
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, MockHandler)
+        self.config = config
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def count(self, status):
+        with self.lock:
+            self.counts[status] = self.counts.get(status, 0) + 1
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+def start_mock_server(config=None, port=0):
+    """在后台线程启动模拟服务器，port=0 时随机选端口；用 server.base_url 连接，server.shutdown() 停止"""
+    server = MockServer(("127.0.0.1", port), config or MockConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容模拟服务器")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="返回 429 的比例")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 503 的比例")
+    parser.add_argument("--first-token-delay", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--reply-words", type=int, default=0)
+    args = parser.parse_args()
+    config = MockConfig(args.latency, args.jitter, args.rate_limit_rate, args.error_rate,
+                        first_token_delay=args.first_token_delay, token_delay=args.token_delay,
+                        reply_words=args.reply_words)
+    server = MockServer(("127.0.0.1", args.port), config)
+    print(f"模拟服务器: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(server.counts)
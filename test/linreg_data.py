@@ -0,0 +1,127 @@
+import math
+import os
+import time
+
+import numpy as np
+import torch
+from torch.utils import data
+
+class BatchIterator:
+    """内存中的小批量迭代器，代替 TensorDataset + DataLoader。
+
+    每个 epoch 生成一次随机排列，用 index_select 把整个数据集按排列取一遍，之后每批都是切片（视图），
+    没有逐样本的 __getitem__ 和拼接。不打乱时直接切片原数组。可以反复迭代，len() 是批数。
+    """
+    def __init__(self, data_arrays, batch_size, shuffle=True, generator=None):
+        self.arrays = tuple(data_arrays)
+        self.num_examples = len(self.arrays[0])
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.generator = generator
+
+    def __len__(self):
+        return math.ceil(self.num_examples / self.batch_size)
+
+    def __iter__(self):
+        arrays = self.arrays
+        if self.shuffle:
+            indices = torch.randperm(self.num_examples, generator=self.generator)
+            arrays = tuple(a.index_select(0, indices) for a in arrays)
+        for i in range(0, self.num_examples, self.batch_size):
+            yield tuple(a[i:i + self.batch_size] for a in arrays)
+
+class MemmapDataset:
+    """按块读取磁盘上的 features.npy/labels.npy（write_synthetic 的输出）来训练。
+
+    每块单独建一个内存映射，复制成张量后立即解除映射，进程里最多同时有一两块数据，
+    峰值内存与总行数无关。每个 epoch 打乱块的顺序，块内再用 BatchIterator 打乱并切片取批；
+    这不是全局打乱，但块足够大时对 SGD 没有影响。start/stop 选出其中一段行，用于训练/验证划分。
+    """
+    def __init__(self, directory, batch_size, chunk_rows=1 << 16, shuffle=True, start=0, stop=None, generator=None):
+        self.layout = {}
+        for name in ("features", "labels"):
+            path = os.path.join(directory, f"{name}.npy")
+            array = np.load(path, mmap_mode="r")
+            self.layout[name] = (path, array.dtype, array.shape[1:], array.offset)
+            num_rows = len(array)
+            del array
+        self.batch_size = batch_size
+        # 块大小取批大小的整数倍，只有最后一块会出现不满的批
+        self.chunk_rows = max(batch_size, chunk_rows // batch_size * batch_size)
+        self.shuffle = shuffle
+        self.start = start
+        self.stop = num_rows if stop is None else stop
+        self.generator = generator
+
+    def __len__(self):
+        return math.ceil((self.stop - self.start) / self.batch_size)
+
+    def chunks(self):
+        return [(lo, min(lo + self.chunk_rows, self.stop)) for lo in range(self.start, self.stop, self.chunk_rows)]
+
+    def read(self, name, lo, hi):
+        path, dtype, row_shape, offset = self.layout[name]
+        row_bytes = dtype.itemsize * math.prod(row_shape)
+        block = np.memmap(path, dtype, "r", offset + lo * row_bytes, (hi - lo,) + row_shape)
+        chunk = torch.from_numpy(np.array(block))
+        del block  # 解除映射，读过的页不留在本进程里
+        return chunk
+
+    def __iter__(self):
+        chunks = self.chunks()
+        if self.shuffle:
+            order = torch.randperm(len(chunks), generator=self.generator).tolist()
+            chunks = [chunks[i] for i in order]
+        for lo, hi in chunks:
+            arrays = (self.read("features", lo, hi), self.read("labels", lo, hi))
+            yield from BatchIterator(arrays, self.batch_size, self.shuffle, self.generator)
+
+def write_synthetic(directory, w, b, num_examples, chunk_rows=1 << 20, seed=0):
+    """生成与 d2l.synthetic_data 同分布的数据，按块写入 directory 下的 features.npy/labels.npy"""
+    os.makedirs(directory, exist_ok=True)
+    w = np.asarray(w, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    features = np.lib.format.open_memmap(os.path.join(directory, "features.npy"), mode="w+",
+                                         dtype=np.float32, shape=(num_examples, len(w)))
+    labels = np.lib.format.open_memmap(os.path.join(directory, "labels.npy"), mode="w+",
+                                       dtype=np.float32, shape=(num_examples, 1))
+    for start in range(0, num_examples, chunk_rows):
+        stop = min(start + chunk_rows, num_examples)
+        X = rng.standard_normal((stop - start, len(w)), dtype=np.float32)
+        features[start:stop] = X
+        labels[start:stop, 0] = X @ w + b + rng.normal(0, 0.01, stop - start).astype(np.float32)
+    features.flush()
+    labels.flush()
+
+def evaluate(net, loss, batches):
+    """逐块累加损失，返回整体的平均损失。loss 按均值归约（如 nn.MSELoss()），batches 产生 (X, y)"""
+    total, count = 0.0, 0
+    with torch.no_grad():
+        for X, y in batches:
+            total += loss(net(X), y).item() * len(X)
+            count += len(X)
+    return total / count
+
+def epoch_time(data_iter, epochs=3):
+    # 只遍历不训练，取几个 epoch 的最短用时
+    best = float("inf")
+    for _ in range(epochs):
+        start = time.perf_counter()
+        for X, y in data_iter:
+            pass
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    # 与 TensorDataset + DataLoader 对比每个 epoch 的遍历时间
+    torch.manual_seed(0)
+    print(f"{'样本数':>8s} {'批大小':>6s} {'DataLoader':>12s} {'BatchIterator':>14s} {'加速':>6s}")
+    for num_examples in (1_000, 10_000, 100_000):
+        features = torch.randn(num_examples, 2)
+        labels = torch.randn(num_examples, 1)
+        for batch_size in (10, 100, 1000):
+            loader = data.DataLoader(data.TensorDataset(features, labels), batch_size, shuffle=True)
+            iterator = BatchIterator((features, labels), batch_size)
+            old = epoch_time(loader)
+            new = epoch_time(iterator)
+            print(f"{num_examples:8d} {batch_size:6d} {old * 1e3:10.1f}ms {new * 1e3:12.1f}ms {old / new:5.1f}x")
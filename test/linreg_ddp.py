@@ -0,0 +1,134 @@
+import argparse
+import math
+import os
+import socket
+import time
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch import nn
+from torch.nn.parallel import DistributedDataParallel
+from d2l import torch as d2l
+
+from linreg_data import BatchIterator
+
+class ShardedBatchIterator(BatchIterator):
+    """DistributedSampler 的做法：每个 epoch 所有进程用同一个种子（seed + epoch）生成同一个排列，
+    补齐到 world_size 的整数倍后，第 rank 个进程取 rank, rank + world_size, ... 这些位置。
+
+    batch_size 是所有进程合起来的批大小，每个进程每步取 batch_size / world_size 个样本。
+    这样每一步所有进程的样本合起来，正好是单进程（world_size=1）同一步的那一批，
+    梯度求平均后与单进程训练一致。这一点只在样本数能被 world_size 整除时成立：
+    否则补齐的样本会被训练两次，最后几批的大小也和单进程不同。
+    """
+    def __init__(self, data_arrays, batch_size, rank=0, world_size=1, seed=0, shuffle=True):
+        if batch_size % world_size:
+            raise ValueError(f"批大小 {batch_size} 不能被进程数 {world_size} 整除")
+        super().__init__(data_arrays, batch_size // world_size, shuffle)
+        self.rank = rank
+        self.world_size = world_size
+        self.seed = seed
+        self.epoch = 0
+        self.num_local = math.ceil(self.num_examples / world_size)
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __len__(self):
+        return math.ceil(self.num_local / self.batch_size)
+
+    def __iter__(self):
+        if self.shuffle:
+            generator = torch.Generator().manual_seed(self.seed + self.epoch)
+            indices = torch.randperm(self.num_examples, generator=generator)
+        else:
+            indices = torch.arange(self.num_examples)
+        padding = self.num_local * self.world_size - self.num_examples
+        if padding:
+            indices = torch.cat([indices, indices[:padding]])
+        indices = indices[self.rank::self.world_size]
+        arrays = tuple(a.index_select(0, indices) for a in self.arrays)
+        for i in range(0, self.num_local, self.batch_size):
+            yield tuple(a[i:i + self.batch_size] for a in arrays)
+
+def make_problem(num_examples, num_inputs, seed):
+    # 每个进程用同一个种子生成同一份数据和同一个初始模型
+    torch.manual_seed(seed)
+    true_w = torch.randn(num_inputs)
+    features, labels = d2l.synthetic_data(true_w, 4.2, num_examples)
+    net = nn.Sequential(nn.Linear(num_inputs, 1))
+    net[0].weight.data.normal_(0, 0.01)
+    net[0].bias.data.fill_(0)
+    return features, labels, net
+
+def train(net, data_iter, epochs, lr):
+    # test1.py 的 SGD 循环，每个 epoch 前通知迭代器换排列
+    loss = nn.MSELoss()
+    trainer = torch.optim.SGD(net.parameters(), lr=lr)
+    for epoch in range(epochs):
+        data_iter.set_epoch(epoch)
+        for X, y in data_iter:
+            l = loss(net(X), y)
+            trainer.zero_grad()
+            l.backward()  # DDP 在这里对梯度做 all-reduce
+            trainer.step()
+
+def _worker(rank, world_size, port, args, results):
+    os.environ["MASTER_ADDR"] = "127.0.0.1"
+    os.environ["MASTER_PORT"] = str(port)
+    torch.set_num_threads(max(1, os.cpu_count() // world_size))
+    dist.init_process_group("gloo", rank=rank, world_size=world_size)
+    try:
+        features, labels, net = make_problem(args.examples, args.features, args.seed)
+        model = DistributedDataParallel(net)
+        data_iter = ShardedBatchIterator((features, labels), args.batch_size, rank, world_size, args.seed)
+        dist.barrier()
+        start = time.perf_counter()
+        train(model, data_iter, args.epochs, args.lr)
+        dist.barrier()
+        elapsed = time.perf_counter() - start
+        if rank == 0:
+            # 传普通的 list：张量经共享内存传递，要求读的时候发送进程还活着
+            results.put((elapsed, net[0].weight.detach().tolist(), net[0].bias.detach().tolist()))
+    finally:
+        dist.destroy_process_group()
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def train_distributed(world_size, args):
+    """在本机起 world_size 个 gloo 进程训练，返回 (用时, 权重, 偏置)"""
+    results = mp.get_context("spawn").SimpleQueue()
+    mp.spawn(_worker, args=(world_size, free_port(), args, results), nprocs=world_size, join=True)
+    elapsed, weight, bias = results.get()
+    return elapsed, torch.tensor(weight), torch.tensor(bias)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="gloo + DistributedDataParallel 的 CPU 数据并行训练")
+    parser.add_argument("--examples", type=int, default=262_144)
+    parser.add_argument("--features", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=256, help="所有进程合计的批大小")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--lr", type=float, default=0.03)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    for world_size in args.workers:
+        if args.examples % world_size:
+            parser.error(f"样本数 {args.examples} 不能被进程数 {world_size} 整除，结果无法与单进程对比")
+
+    # 单进程、不用 DDP 的结果作为基准，各进程数的权重都应与它一致
+    features, labels, net = make_problem(args.examples, args.features, args.seed)
+    start = time.perf_counter()
+    train(net, ShardedBatchIterator((features, labels), args.batch_size, seed=args.seed), args.epochs, args.lr)
+    base_time = time.perf_counter() - start
+    samples = args.examples * args.epochs
+    print(f"单进程: {base_time:7.2f} s, {samples / base_time:12,.0f} 样本/s")
+    for world_size in args.workers:
+        elapsed, weight, bias = train_distributed(world_size, args)
+        error = max((weight - net[0].weight.data).abs().max().item(), (bias - net[0].bias.data).abs().max().item())
+        print(f"{world_size:3d} 进程: {elapsed:7.2f} s, {samples / elapsed:12,.0f} 样本/s, "
+              f"加速 {base_time / elapsed:4.2f}x, 与单进程的最大差 {error:.1e}")
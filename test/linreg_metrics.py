@@ -0,0 +1,131 @@
+import csv
+import json
+import os
+import resource
+from contextlib import contextmanager, nullcontext
+from time import perf_counter_ns
+
+import torch
+from d2l import torch as d2l
+
+# 训练循环中每一批的阶段，按发生顺序排列
+PHASES = ["data", "forward", "backward", "optimizer"]
+
+def peak_rss_mb():
+    # Linux 上 ru_maxrss 的单位是 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class TrainingMetrics:
+    """记录每批各阶段耗时（纳秒），以及每轮的样本吞吐量和峰值内存。
+
+    和 snake_profiler.FrameProfiler 一样，mark(phase) 把上一次 mark 到现在的时间记到 phase 上；
+    batches() 包装数据迭代器，取一批数据的时间记为 "data"。
+    """
+    def __init__(self, phases=PHASES):
+        self.phases = list(phases)
+        self.index = {phase: i for i, phase in enumerate(self.phases)}
+        self.batch_rows = []
+        self.epoch_rows = []
+        self.epoch = 0
+        self.start_epoch()
+
+    def start_epoch(self):
+        self.batch = 0
+        self.samples = 0
+        self.totals = [0] * len(self.phases)
+        self.current = [0] * len(self.phases)
+        self.epoch_start = self.last = perf_counter_ns()
+
+    def batches(self, iterable):
+        self.last = perf_counter_ns()
+        for batch in iterable:
+            self.mark("data")
+            yield batch
+
+    def mark(self, phase):
+        now = perf_counter_ns()
+        self.current[self.index[phase]] += now - self.last
+        self.last = now
+
+    def end_batch(self, samples):
+        self.batch_rows.append([self.epoch, self.batch, samples] + self.current)
+        self.totals = [t + c for t, c in zip(self.totals, self.current)]
+        self.samples += samples
+        self.batch += 1
+        self.current = [0] * len(self.phases)
+
+    def end_epoch(self):
+        seconds = (perf_counter_ns() - self.epoch_start) / 1e9
+        row = {"epoch": self.epoch, "batches": self.batch, "samples": self.samples, "seconds": seconds,
+               "samples_per_sec": self.samples / seconds if seconds else 0.0, "peak_rss_mb": peak_rss_mb()}
+        row.update({f"{phase}_s": total / 1e9 for phase, total in zip(self.phases, self.totals)})
+        self.epoch_rows.append(row)
+        self.epoch += 1
+        return row
+
+    def summary(self, row):
+        busy = sum(row[f"{phase}_s"] for phase in self.phases) or 1.0
+        shares = " ".join(f"{phase} {row[f'{phase}_s'] / busy:.0%}" for phase in self.phases)
+        return f"{row['samples_per_sec']:,.0f} 样本/s ({shares}), 峰值内存 {row['peak_rss_mb']:.0f} MB"
+
+    def dump(self, path):
+        # 按扩展名写 JSON 或 CSV；CSV 每批一行，每轮汇总另写到 *_epochs.csv
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump({"phases": self.phases, "epochs": self.epoch_rows, "batches": self.batch_rows}, f)
+            return
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["epoch", "batch", "samples"] + self.phases)
+            writer.writerows(self.batch_rows)
+        if self.epoch_rows:
+            with open(os.path.splitext(path)[0] + "_epochs.csv", "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(self.epoch_rows[0]))
+                writer.writeheader()
+                writer.writerows(self.epoch_rows)
+
+@contextmanager
+def _profile(path):
+    with torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU], record_shapes=True) as prof:
+        yield prof
+    prof.export_chrome_trace(path)
+
+def trace(path):
+    """path 为 None 时什么也不做，否则用 torch.profiler 记录其中的代码并导出 Chrome trace"""
+    return _profile(path) if path else nullcontext()
+
+class MetricsTrainer(d2l.Trainer):  #@save
+    """d2l.Trainer 加上 TrainingMetrics 计时，其余行为不变。
+
+    d2l 的 training_step 里包含画图，这部分时间算在 forward 里。
+    """
+    def __init__(self, max_epochs, num_gpus=0, gradient_clip_val=0, metrics=None):
+        super().__init__(max_epochs, num_gpus, gradient_clip_val)
+        self.metrics = metrics or TrainingMetrics()
+
+    def fit_epoch(self):
+        metrics = self.metrics
+        self.model.train()
+        metrics.start_epoch()
+        for batch in metrics.batches(self.train_dataloader):
+            batch = self.prepare_batch(batch)
+            loss = self.model.training_step(batch)
+            metrics.mark("forward")
+            self.optim.zero_grad()
+            with torch.no_grad():
+                loss.backward()
+                if self.gradient_clip_val > 0:
+                    self.clip_gradients(self.gradient_clip_val, self.model)
+                metrics.mark("backward")
+                self.optim.step()
+            metrics.mark("optimizer")
+            metrics.end_batch(len(batch[-1]))
+            self.train_batch_idx += 1
+        print(f"epoch {self.epoch + 1}, {metrics.summary(metrics.end_epoch())}")
+        if self.val_dataloader is None:
+            return
+        self.model.eval()
+        for batch in self.val_dataloader:
+            with torch.no_grad():
+                self.model.validation_step(self.prepare_batch(batch))
+            self.val_batch_idx += 1
@@ -0,0 +1,97 @@
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch
+from torch import nn
+
+from linreg_data import BatchIterator, MemmapDataset, write_synthetic
+from linreg_stream import train
+
+def shard_stats(directory, start, stop, chunk_rows=1 << 18):
+    """[start, stop) 行的 XᵀX 和 Xᵀy，X 末尾补一列 1 对应偏置，用 float64 累加"""
+    dataset = MemmapDataset(directory, chunk_rows, chunk_rows, shuffle=False, start=start, stop=stop)
+    d = dataset.layout["features"][2][0]
+    xtx = np.zeros((d + 1, d + 1))
+    xty = np.zeros(d + 1)
+    for X, y in dataset:
+        X = X.numpy().astype(np.float64)
+        y = y.numpy()[:, 0].astype(np.float64)
+        column_sums = X.sum(axis=0)
+        xtx[:d, :d] += X.T @ X
+        xtx[:d, d] += column_sums
+        xtx[d, :d] += column_sums
+        xtx[d, d] += len(X)
+        xty[:d] += X.T @ y
+        xty[d] += y.sum()
+    return xtx, xty
+
+def solve_ridge(xtx, xty, alpha=0.0):
+    # (XᵀX + αI)θ = Xᵀy，偏置不加正则
+    reg = alpha * np.eye(len(xty))
+    reg[-1, -1] = 0
+    theta = np.linalg.solve(xtx + reg, xty)
+    return theta[:-1], theta[-1]
+
+def fit_ridge(directory, alpha=0.0, num_workers=None, chunk_rows=1 << 18):
+    """一次遍历 write_synthetic 格式的数据求岭回归解，返回 (w, b)。
+
+    行按进程数切成连续的几段，每个进程只拿到目录和行范围，自己映射文件读取，
+    不传数据本身；各段的 XᵀX、Xᵀy 相加后解正规方程。
+    """
+    num_rows = len(np.load(os.path.join(directory, "labels.npy"), mmap_mode="r"))
+    num_workers = max(1, min(num_workers or os.cpu_count(), num_rows))
+    bounds = np.linspace(0, num_rows, num_workers + 1).astype(int).tolist()
+    if num_workers == 1:
+        xtx, xty = shard_stats(directory, 0, num_rows, chunk_rows)
+    else:
+        with ProcessPoolExecutor(num_workers) as pool:
+            results = list(pool.map(shard_stats, [directory] * num_workers, bounds[:-1], bounds[1:],
+                                    [chunk_rows] * num_workers))
+        xtx = sum(r[0] for r in results)
+        xty = sum(r[1] for r in results)
+    return solve_ridge(xtx, xty, alpha)
+
+def load_linear(linear, w, b):
+    """把解写进 nn.Linear，例如 test1 的 net[0] 或 test2 的 model.net"""
+    with torch.no_grad():
+        if isinstance(linear.weight, nn.parameter.UninitializedParameter):
+            linear(torch.zeros(1, len(w)))  # LazyLinear 先跑一次确定输入维度
+        linear.weight.copy_(torch.as_tensor(w, dtype=linear.weight.dtype).reshape(linear.weight.shape))
+        linear.bias.fill_(float(b))
+
+if __name__ == "__main__":
+    # 随行数增加，对比 test1 的 SGD（3 个 epoch）和一次遍历的岭回归
+    parser = argparse.ArgumentParser(description="正规方程求解与 SGD 的耗时对比")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--alpha", type=float, default=0.0)
+    parser.add_argument("--sgd-max-rows", type=int, default=1_000_000, help="超过这个行数不再跑 SGD")
+    args = parser.parse_args()
+
+    true_w = np.array([2, -3.4])
+    true_b = 4.2
+    with tempfile.TemporaryDirectory() as root:
+        for num_rows in (10_000, 100_000, 1_000_000, 10_000_000):
+            directory = os.path.join(root, str(num_rows))
+            write_synthetic(directory, true_w, true_b, num_rows)
+
+            start = time.perf_counter()
+            w, b = fit_ridge(directory, args.alpha, args.workers)
+            solve_time = time.perf_counter() - start
+            net = nn.Sequential(nn.Linear(2, 1))
+            load_linear(net[0], w, b)
+            error = np.abs(net[0].weight.data.numpy().ravel() - true_w).max()
+            line = f"{num_rows:10,d} 行: 求解 {solve_time:7.2f} s (w 误差 {error:.1e})"
+
+            if num_rows <= args.sgd_max_rows:
+                features = torch.from_numpy(np.load(os.path.join(directory, "features.npy")))
+                labels = torch.from_numpy(np.load(os.path.join(directory, "labels.npy")))
+                start = time.perf_counter()
+                net, _ = train(BatchIterator((features, labels), 10), 3, 0.03)
+                sgd_time = time.perf_counter() - start
+                error = np.abs(net[0].weight.data.numpy().ravel() - true_w).max()
+                line += f", SGD {sgd_time:7.2f} s (w 误差 {error:.1e})"
+            print(line)
@@ -0,0 +1,79 @@
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+
+import numpy as np
+import torch
+from torch import nn
+from d2l import torch as d2l
+
+from linreg_data import BatchIterator, MemmapDataset, evaluate, write_synthetic
+from linreg_metrics import peak_rss_mb
+from test2 import LinearRegression
+
+class MemmapRegressionData(d2l.DataModule):  #@save
+    """磁盘上的回归数据，用法同 d2l.SyntheticRegressionData：前 num_train 行训练，其余行验证"""
+    def __init__(self, directory, num_train, batch_size=32, chunk_rows=1 << 16):
+        super().__init__()
+        self.save_hyperparameters()
+
+    def get_dataloader(self, train):
+        if train:
+            return MemmapDataset(self.directory, self.batch_size, self.chunk_rows, True, 0, self.num_train)
+        return MemmapDataset(self.directory, self.batch_size, self.chunk_rows, False, self.num_train)
+
+def train(data_iter, epochs, lr):
+    # 与 test1.py 相同的模型和 SGD 循环，返回 (模型, 每秒样本数)
+    net = nn.Sequential(nn.Linear(2, 1))
+    net[0].weight.data.normal_(0, 0.01)
+    net[0].bias.data.fill_(0)
+    loss = nn.MSELoss()
+    trainer = torch.optim.SGD(net.parameters(), lr=lr)
+    samples = 0
+    start = time.perf_counter()
+    for epoch in range(epochs):
+        for X, y in data_iter:
+            l = loss(net(X), y)
+            trainer.zero_grad()
+            l.backward()
+            trainer.step()
+            samples += len(X)
+    return net, samples / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="内存映射数据上的流式训练")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--dir", help="数据目录，不存在时生成并保留；默认用临时目录，运行结束后删除")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--chunk-rows", type=int, default=1 << 18)
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--lr", type=float, default=0.03)
+    parser.add_argument("--compare", action="store_true", help="再把全部数据读进内存训练一遍，对比吞吐量")
+    parser.add_argument("--trainer", action="store_true", help="改用 test2.py 的 d2l.Trainer 训练")
+    args = parser.parse_args()
+
+    temporary = tempfile.TemporaryDirectory(prefix="linreg_") if args.dir is None else contextlib.nullcontext(args.dir)
+    with temporary as directory:
+        if not os.path.exists(os.path.join(directory, "features.npy")):
+            start = time.perf_counter()
+            write_synthetic(directory, [2, -3.4], 4.2, args.rows)
+            print(f"生成 {args.rows:,} 行数据: {time.perf_counter() - start:.1f} s ({directory})")
+
+        if args.trainer:
+            num_train = len(np.load(os.path.join(directory, "labels.npy"), mmap_mode="r")) * 9 // 10
+            model = LinearRegression(lr=args.lr)
+            data = MemmapRegressionData(directory, num_train, args.batch_size, args.chunk_rows)
+            d2l.Trainer(max_epochs=args.epochs).fit(model, data)
+            print(f"峰值内存 {peak_rss_mb():.0f} MB")
+        else:
+            stream = MemmapDataset(directory, args.batch_size, args.chunk_rows)
+            net, rate = train(stream, args.epochs, args.lr)
+            l = evaluate(net, nn.MSELoss(), MemmapDataset(directory, args.chunk_rows, args.chunk_rows, shuffle=False))
+            print(f"流式: {rate:,.0f} 样本/s, 损失 {l:f}, 峰值内存 {peak_rss_mb():.0f} MB")
+            if args.compare:
+                features = torch.from_numpy(np.load(os.path.join(directory, "features.npy")))
+                labels = torch.from_numpy(np.load(os.path.join(directory, "labels.npy")))
+                net, rate = train(BatchIterator((features, labels), args.batch_size), args.epochs, args.lr)
+                print(f"内存: {rate:,.0f} 样本/s, 峰值内存 {peak_rss_mb():.0f} MB")
@@ -0,0 +1,170 @@
+import argparse
+import csv
+import itertools
+import math
+import multiprocessing as mp
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import torch
+from d2l import torch as d2l
+
+from linreg_data import BatchIterator
+from test2 import LinearRegression
+
+# 工作进程里的共享数据和进度表，由 _init_worker 设置
+_shared = {}
+
+class EarlyStop(Exception):
+    pass
+
+class SharedRegressionData(d2l.DataModule):  #@save
+    """放在共享内存里的回归数据：前 num_train 行训练，其余行验证"""
+    def __init__(self, features, labels, num_train, batch_size):
+        super().__init__()
+        self.save_hyperparameters()
+
+    def get_dataloader(self, train):
+        rows = slice(0, self.num_train) if train else slice(self.num_train, None)
+        return BatchIterator((self.features[rows], self.labels[rows]), self.batch_size, shuffle=train)
+
+class SweepModel(LinearRegression):
+    """不画图，按批记下验证损失供早停判断"""
+    def __init__(self, lr):
+        super().__init__(lr)
+        self.val_losses = []
+
+    def plot(self, key, value, train):
+        pass
+
+    def validation_step(self, batch):
+        l = self.loss(self(*batch[:-1]), batch[-1])
+        self.val_losses.append((l.item(), len(batch[-1])))
+
+class SweepTrainer(d2l.Trainer):
+    """每个 epoch 后把验证损失写进共享进度表。
+
+    损失发散，或者从第 min_epochs 个 epoch 起比其他试验同一 epoch 的中位数还差（至少要有
+    min_reports 个其他试验报告过），就抛出 EarlyStop 结束这次试验。
+    """
+    def __init__(self, max_epochs, trial, min_epochs=2, min_reports=3):
+        super().__init__(max_epochs)
+        self.trial = trial
+        self.min_epochs = min_epochs
+        self.min_reports = min_reports
+        self.history = []
+
+    def median_loss(self, epoch):
+        progress, stride = _shared["progress"], self.max_epochs
+        others = [progress[t * stride + epoch] for t in range(len(progress) // stride) if t != self.trial]
+        others = sorted(l for l in others if not math.isnan(l))
+        if len(others) < self.min_reports:
+            return math.inf
+        return others[len(others) // 2]
+
+    def fit_epoch(self):
+        self.model.val_losses = []
+        super().fit_epoch()
+        total = sum(l * n for l, n in self.model.val_losses)
+        loss = total / sum(n for _, n in self.model.val_losses)
+        self.history.append(loss)
+        _shared["progress"][self.trial * self.max_epochs + self.epoch] = loss if math.isfinite(loss) else math.inf
+        if not math.isfinite(loss):
+            raise EarlyStop("发散")
+        if self.epoch + 1 >= self.min_epochs and loss > self.median_loss(self.epoch):
+            raise EarlyStop("差于中位数")
+
+def _init_worker(shm_name, num_rows, num_inputs, num_train, progress, threads):
+    # 每个进程固定线程数，避免多个试验争抢同一批核心
+    torch.set_num_threads(threads)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    features = np.ndarray((num_rows, num_inputs), dtype=np.float32, buffer=shm.buf)
+    labels = np.ndarray((num_rows, 1), dtype=np.float32, buffer=shm.buf, offset=features.nbytes)
+    _shared.update(shm=shm, features=torch.from_numpy(features), labels=torch.from_numpy(labels),
+                   num_train=num_train, progress=progress)
+
+def run_trial(trial, lr, batch_size, max_epochs):
+    torch.manual_seed(trial)
+    model = SweepModel(lr)
+    data = SharedRegressionData(_shared["features"], _shared["labels"], _shared["num_train"], batch_size)
+    trainer = SweepTrainer(max_epochs, trial)
+    stopped = ""
+    start = time.perf_counter()
+    try:
+        trainer.fit(model, data)
+    except EarlyStop as e:
+        stopped = str(e)
+    finite = [l for l in trainer.history if math.isfinite(l)]
+    return {
+        "trial": trial, "lr": lr, "batch_size": batch_size, "epochs": len(trainer.history),
+        "best_val_loss": min(finite, default=math.inf),
+        "final_val_loss": trainer.history[-1] if trainer.history else math.inf,
+        "stopped": stopped, "seconds": time.perf_counter() - start,
+    }
+
+def make_trials(args):
+    # 网格搜索：学习率和批大小的所有组合；--random N：学习率在范围内按对数均匀取 N 个
+    if args.random:
+        rng = random.Random(args.seed)
+        low, high = math.log(min(args.lr)), math.log(max(args.lr))
+        return [(math.exp(rng.uniform(low, high)), rng.choice(args.batch_size)) for _ in range(args.random)]
+    return list(itertools.product(args.lr, args.batch_size))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="test2 LinearRegression 的并行超参数搜索")
+    parser.add_argument("--lr", type=float, nargs="+", default=[0.001, 0.003, 0.01, 0.03, 0.1, 0.3])
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--random", type=int, default=0, help="随机搜索的试验数，0 表示网格搜索")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--num-train", type=int, default=20_000)
+    parser.add_argument("--num-val", type=int, default=5_000, help="验证集行数，剪枝和排序都靠验证损失，必须大于 0")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="sweep_results.csv")
+    args = parser.parse_args()
+    if args.num_val <= 0:
+        parser.error("--num-val 必须大于 0")
+
+    # 与 d2l.SyntheticRegressionData 同分布的数据，只生成一份放进共享内存
+    true_w = np.array([2, -3.4], dtype=np.float32)
+    num_rows = args.num_train + args.num_val
+    rng = np.random.default_rng(args.seed)
+    shm = shared_memory.SharedMemory(create=True, size=num_rows * (len(true_w) + 1) * 4)
+    features = np.ndarray((num_rows, len(true_w)), dtype=np.float32, buffer=shm.buf)
+    labels = np.ndarray((num_rows, 1), dtype=np.float32, buffer=shm.buf, offset=features.nbytes)
+    features[:] = rng.standard_normal(features.shape, dtype=np.float32)
+    labels[:, 0] = features @ true_w + 4.2 + rng.normal(0, 0.01, num_rows).astype(np.float32)
+
+    trials = make_trials(args)
+    progress = mp.Array("d", [math.nan] * (len(trials) * args.epochs), lock=False)
+    threads = max(1, os.cpu_count() // args.workers)
+    results = []
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(args.workers, initializer=_init_worker,
+                                 initargs=(shm.name, num_rows, len(true_w), args.num_train, progress, threads)) as pool:
+            futures = [pool.submit(run_trial, i, lr, batch_size, args.epochs) for i, (lr, batch_size) in enumerate(trials)]
+            for future in as_completed(futures):
+                results.append(future.result())
+    finally:
+        del features, labels
+        shm.close()
+        shm.unlink()
+    elapsed = time.perf_counter() - start
+
+    results.sort(key=lambda r: r["best_val_loss"])
+    with open(args.out, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"{'学习率':>8s} {'批大小':>6s} {'轮数':>4s} {'最佳验证损失':>12s} {'用时':>7s}  提前结束")
+    for r in results:
+        print(f"{r['lr']:8.4f} {r['batch_size']:6d} {r['epochs']:4d} {r['best_val_loss']:12.3e} "
+              f"{r['seconds']:6.2f}s  {r['stopped']}")
+    busy = sum(r["seconds"] for r in results)
+    print(f"{len(trials)} 个试验, {args.workers} 个进程 x {threads} 线程: 总用时 {elapsed:.1f} s, "
+          f"试验耗时合计 {busy:.1f} s (并行度 {busy / elapsed:.1f}), 结果写入 {args.out}")
@@ -1,7 +1,14 @@
+import argparse
 import pygame
 import random
 import sys
 import time
+from collections import OrderedDict
+
+from snake_core import SnakeGame, UP, DOWN, LEFT, RIGHT, EVENT_SPECIAL, EVENT_DEAD
+from snake_replay import ReplayRecorder, new_seed
+from snake_profiler import FrameProfiler
+from snake_autopilot import Autopilot
 
 # 初始化 Pygame
 pygame.init()
@@ -11,9 +18,13 @@ WIDTH, HEIGHT = 700, 600  # 增加宽度以容纳控制面板
 GRID_SIZE = 20
 GRID_WIDTH = (WIDTH - 100) // GRID_SIZE  # 游戏区域宽度
 GRID_HEIGHT = HEIGHT // GRID_SIZE
-MIN_FPS = 5
+MIN_FPS = 5  # 游戏速度（每秒逻辑步数）
 MAX_FPS = 20
 INITIAL_FPS = 10
+RENDER_FPS = 60  # 画面刷新率，与游戏速度无关
+MAX_STEPS_PER_FRAME = 5  # 卡顿后最多补几步，超出的直接丢弃
+CAMERA_MARGIN = 5  # 大地图模式下蛇头离视口边缘的最小格数
+BUCKET_SIZE = 16  # 大地图模式下蛇身空间分区的区块边长
 
 # 颜色定义
 BLACK = (0, 0, 0)
@@ -30,11 +41,38 @@ CYAN = (0, 255, 255)
 ORANGE = (255, 165, 0)
 GOLD = (255, 215, 0)
 
-# 方向常量
-UP = (0, -1)
-DOWN = (0, 1)
-LEFT = (-1, 0)
-RIGHT = (1, 0)
+class Resources:
+    """启动时一次性加载所有字体，并按 (字体, 文字, 颜色) 缓存渲染好的文字，超出容量时淘汰最久未用的"""
+    FONTS = {
+        'normal': ('microsoftyahei', 20, False),
+        'title': ('microsoftyahei', 16, True),
+        'bonus': ('microsoftyahei', 24, True),
+        'game_over': ('microsoftyahei', 40, False),
+    }
+    
+    def __init__(self, max_texts=256):
+        start = time.perf_counter()
+        self.fonts = {name: pygame.font.SysFont(face, size, bold=bold)
+                      for name, (face, size, bold) in self.FONTS.items()}
+        self.font_load_time = time.perf_counter() - start
+        self.max_texts = max_texts
+        self.texts = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        
+    def text(self, font, text, color):
+        key = (font, text, color)
+        surface = self.texts.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.texts.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = self.fonts[font].render(text, True, color)
+        self.texts[key] = surface
+        if len(self.texts) > self.max_texts:
+            self.texts.popitem(last=False)
+        return surface
 
 class Slider:
     def __init__(self, x, y, width, height, min_val, max_val, initial_val):
@@ -101,19 +139,19 @@ class Slider:
         return False
 
 class Button:
-    def __init__(self, x, y, width, height, text, color, hover_color):
+    def __init__(self, x, y, width, height, text, color, hover_color, resources):
         self.rect = pygame.Rect(x, y, width, height)
         self.text = text
         self.color = color
         self.hover_color = hover_color
         self.current_color = color
-        self.font = pygame.font.SysFont('microsoftyahei', 20)
+        self.resources = resources
         
     def draw(self, surface):
         pygame.draw.rect(surface, self.current_color, self.rect, border_radius=5)
         pygame.draw.rect(surface, BLACK, self.rect, 2, border_radius=5)
         
-        text_surface = self.font.render(self.text, True, BLACK)
+        text_surface = self.resources.text('normal', self.text, BLACK)
         text_rect = text_surface.get_rect(center=self.rect.center)
         surface.blit(text_surface, text_rect)
         
@@ -147,192 +185,258 @@ class ColorOption:
             return self.rect.collidepoint(pos)
         return False
 
-class Snake:
-    def __init__(self):
-        self.reset()
-        
-    def reset(self):
-        self.length = 3
-        self.positions = [(GRID_WIDTH // 2, GRID_HEIGHT // 2)]
-        self.direction = random.choice([UP, DOWN, LEFT, RIGHT])
-        self.score = 0
-        self.grow_to = 3
-        self.color = GREEN
-        self.head_color = BLUE
-        self.s_shape_bonus_available = True
-        self.s_shape_bonus_claimed = False
-        self.s_shape_timer = 0
-        
-    def get_head_position(self):
-        return self.positions[0]
+PLAY_RECT = pygame.Rect(0, 0, WIDTH - 100, HEIGHT)
+PANEL_RECT = pygame.Rect(WIDTH - 100, 0, 100, HEIGHT)
+
+def cell_rect(position):
+    return pygame.Rect((position[0] * GRID_SIZE, position[1] * GRID_SIZE), (GRID_SIZE, GRID_SIZE))
+
+def draw_segment(surface, position, color):
+    r = cell_rect(position)
+    pygame.draw.rect(surface, color, r)
+    pygame.draw.rect(surface, WHITE, r, 1)
+
+def draw_food(surface, position):
+    draw_segment(surface, position, GREEN)
+
+def draw_special_food(surface, position):
+    draw_segment(surface, position, GOLD)
     
-    def turn(self, point):
-        if self.length > 1 and (point[0] * -1, point[1] * -1) == self.direction:
-            return
-        else:
-            self.direction = point
+    # 绘制闪烁效果
+    if (pygame.time.get_ticks() // 200) % 2 == 0:
+        pygame.draw.circle(surface, ORANGE, cell_rect(position).center, GRID_SIZE // 2, 2)
+
+def draw_grid(surface):
+    for y in range(0, HEIGHT, GRID_SIZE):
+        for x in range(0, WIDTH - 100, GRID_SIZE):
+            r = pygame.Rect((x, y), (GRID_SIZE, GRID_SIZE))
+            pygame.draw.rect(surface, GRAY, r, 1)
+
+def build_background(resources):
+    # 网格、控制面板底色和固定文字只画一次
+    background = pygame.Surface((WIDTH, HEIGHT))
+    background.fill(BLACK)
+    draw_grid(background)
     
-    def move(self):
-        head = self.get_head_position()
-        x, y = self.direction
-        new_x = (head[0] + x) % GRID_WIDTH
-        new_y = (head[1] + y) % GRID_HEIGHT
-        new_position = (new_x, new_y)
-        
-        if new_position in self.positions[1:]:
-            self.reset()
-            return False
-        
-        self.positions.insert(0, new_position)
-        
-        if len(self.positions) > self.grow_to:
-            self.positions.pop()
-            
-        # 检查是否形成S形
-        self.check_s_shape()
-            
-        return True
+    pygame.draw.rect(background, (50, 50, 50), PANEL_RECT)
+    pygame.draw.line(background, WHITE, (WIDTH - 100, 0), (WIDTH - 100, HEIGHT), 2)
     
-    def check_s_shape(self):
-        # 检查蛇是否形成了S形
-        if len(self.positions) < 7 or not self.s_shape_bonus_available:
-            return
-            
-        # 获取蛇的前7个部分
-        head = self.positions[0]
-        segments = self.positions[:7]
-        
-        # 检查是否形成S形模式
-        # S形模式: 右-右-下-下-左-左 或类似的变化
-        x_coords = [p[0] for p in segments]
-        y_coords = [p[1] for p in segments]
-        
-        # 检查水平S形
-        if (x_coords[0] == x_coords[1] == x_coords[2] and 
-            x_coords[3] == x_coords[4] and 
-            x_coords[5] == x_coords[6] and
-            abs(x_coords[0] - x_coords[3]) == 1 and
-            abs(x_coords[3] - x_coords[5]) == 1 and
-            y_coords[0] == y_coords[1] and
-            y_coords[1] != y_coords[2] and
-            y_coords[2] == y_coords[3] == y_coords[4] and
-            y_coords[4] != y_coords[5] and
-            y_coords[5] == y_coords[6]):
+    background.blit(resources.text('title', "身体颜色:", WHITE), (WIDTH - 90, 160))
+    background.blit(resources.text('title', "头部颜色:", WHITE), (WIDTH - 90, 280))
+    background.blit(resources.text('title', "游戏速度:", WHITE), (WIDTH - 90, 430))
+    background.blit(resources.text('title', "S形奖励100分", GOLD), (WIDTH - 90, 500))
+    background.blit(resources.text('title', "金色食物50分", ORANGE), (WIDTH - 90, 520))
+    return background
+
+class Renderer:
+    """缓存静态背景，每帧只重画变化的格子、文字和面板，并只提交这些区域。
+
+    蛇身画在常驻的 body_layer 上（背景加蛇身），每个逻辑步只改三个格子：擦掉空出的蛇尾、
+    旧蛇头改画成身体颜色、画新蛇头，所以每帧画蛇身的代价与蛇长无关。只有换颜色、重新开始、
+    死亡和视口移动时才整层重画。
+
+    地图比窗口大时，camera 是视口左上角的世界坐标。蛇头靠近视口边缘时，视口以蛇头为中心
+    重新定位，然后整屏重画。整屏重画只会通过蛇身的空间分区找到视口内的格子，所以代价取决于
+    视口大小，与蛇长和地图大小无关。绘制函数使用屏幕格子坐标，to_screen/to_world 负责换算。
+    """
+    def __init__(self, screen, resources, profiler=None):
+        self.screen = screen
+        self.resources = resources
+        self.profiler = profiler
+        self.layout = None
+        self.background = None
+        self.body_layer = None
+        self.full_redraw = True
+        self.dirty_cells = set()
+        self.text_rects = []
+        self.panel_key = None
+        self.snake_color = GREEN
+        self.snake_head_color = BLUE
+        self.camera = (0, 0)
+        
+    def invalidate(self):
+        # 蛇重置、换颜色等无法增量更新的情况，下一帧重画蛇身层并整屏重画
+        self.full_redraw = True
+        
+    def snapshot(self, game):
+        special_food = game.special_food
+        return (game.snake.get_head_position(), game.snake.positions[-1], game.food.position,
+                special_food.position if special_food.active else None)
+        
+    def mark_changes(self, game, before):
+        # 每个逻辑步之后调用：旧蛇头变成身体，旧蛇尾可能空出，食物可能移动
+        if not self.full_redraw:
+            self.update_layer(game, before[0], before[1])
+        for position in before + self.snapshot(game):
+            if position is not None:
+                screen_position = self.to_screen(game, position)
+                if screen_position is not None:
+                    self.dirty_cells.add(screen_position)
+                    
+    def update_layer(self, game, old_head, old_tail):
+        snake = game.snake
+        tail_position = self.to_screen(game, old_tail)
+        if tail_position is not None and not snake.occupies(old_tail):
+            r = cell_rect(tail_position)
+            self.body_layer.blit(self.background, r, r)
+        head = snake.get_head_position()
+        if old_head != head and snake.occupies(old_head):
+            head_position = self.to_screen(game, old_head)
+            if head_position is not None:
+                draw_segment(self.body_layer, head_position, self.snake_color)
+        head_position = self.to_screen(game, head)
+        if head_position is not None:
+            draw_segment(self.body_layer, head_position, self.snake_head_color)
             
-            self.claim_s_shape_bonus()
+    def to_screen(self, game, position):
+        # 世界坐标换成屏幕格子坐标，不在视口内返回 None
+        x = (position[0] - self.camera[0]) % game.width
+        y = (position[1] - self.camera[1]) % game.height
+        if x < GRID_WIDTH and y < GRID_HEIGHT:
+            return (x, y)
+        return None
+        
+    def to_world(self, game, screen_position):
+        return ((screen_position[0] + self.camera[0]) % game.width,
+                (screen_position[1] + self.camera[1]) % game.height)
+        
+    def follow(self, game):
+        # 地图比窗口大时，蛇头离视口边缘不到 CAMERA_MARGIN 格就把视口移到以蛇头为中心
+        if game.width == GRID_WIDTH and game.height == GRID_HEIGHT:
             return
-            
-        # 检查垂直S形
-        if (y_coords[0] == y_coords[1] == y_coords[2] and 
-            y_coords[3] == y_coords[4] and 
-            y_coords[5] == y_coords[6] and
-            abs(y_coords[0] - y_coords[3]) == 1 and
-            abs(y_coords[3] - y_coords[5]) == 1 and
-            x_coords[0] == x_coords[1] and
-            x_coords[1] != x_coords[2] and
-            x_coords[2] == x_coords[3] == x_coords[4] and
-            x_coords[4] != x_coords[5] and
-            x_coords[5] == x_coords[6]):
-            
-            self.claim_s_shape_bonus()
+        head = game.snake.get_head_position()
+        x, y = self.to_screen(game, head) or (-1, -1)
+        if CAMERA_MARGIN <= x < GRID_WIDTH - CAMERA_MARGIN and CAMERA_MARGIN <= y < GRID_HEIGHT - CAMERA_MARGIN:
             return
-    
-    def claim_s_shape_bonus(self):
-        if self.s_shape_bonus_available:
-            self.score += 100  # S形奖励分数
-            self.s_shape_bonus_available = False
-            self.s_shape_bonus_claimed = True
-            self.s_shape_timer = pygame.time.get_ticks()
-    
-    def update_s_shape_status(self):
-        current_time = pygame.time.get_ticks()
-        if self.s_shape_bonus_claimed and current_time - self.s_shape_timer > 3000:  # 3秒后重置
-            self.s_shape_bonus_available = True
-            self.s_shape_bonus_claimed = False
-    
-    def draw(self, surface):
-        for i, p in enumerate(self.positions):
-            r = pygame.Rect((p[0] * GRID_SIZE, p[1] * GRID_SIZE), (GRID_SIZE, GRID_SIZE))
-            
-            # 蛇头用不同颜色
-            if i == 0:
-                pygame.draw.rect(surface, self.head_color, r)
-                pygame.draw.rect(surface, WHITE, r, 1)
-            else:
-                pygame.draw.rect(surface, self.color, r)
-                pygame.draw.rect(surface, WHITE, r, 1)
+        self.camera = ((head[0] - GRID_WIDTH // 2) % game.width, (head[1] - GRID_HEIGHT // 2) % game.height)
+        self.invalidate()
+        
+    def draw_body(self, game, surface):
+        # 只画视口内的蛇身：大地图通过空间分区找候选格子，不遍历整条蛇
+        snake = game.snake
+        if snake.buckets is not None:
+            candidates = snake.buckets.query(self.camera[0], self.camera[1], GRID_WIDTH, GRID_HEIGHT)
+        else:
+            candidates = snake.positions
+        head = snake.get_head_position()
+        for position in candidates:
+            screen_position = self.to_screen(game, position)
+            if screen_position is not None:
+                # 蛇头用不同颜色
+                draw_segment(surface, screen_position, self.snake_head_color if position == head else self.snake_color)
                 
-    def grow(self):
-        self.grow_to += 1
-        self.score += 10
-
-class Food:
-    def __init__(self):
-        self.position = (0, 0)
-        self.randomize_position()
-        
-    def randomize_position(self):
-        self.position = (random.randint(0, GRID_WIDTH - 1), random.randint(0, GRID_HEIGHT - 1))
-        
-    def draw(self, surface):
-        r = pygame.Rect((self.position[0] * GRID_SIZE, self.position[1] * GRID_SIZE), (GRID_SIZE, GRID_SIZE))
-        pygame.draw.rect(surface, GREEN, r)
-        pygame.draw.rect(surface, WHITE, r, 1)
-
-class SpecialFood:
-    def __init__(self):
-        self.position = (0, 0)
-        self.active = False
-        self.spawn_time = 0
-        self.duration = 10000  # 10秒
-        
-    def try_spawn(self):
-        if not self.active and random.random() < 0.01:  # 1%的几率每帧尝试生成
-            self.position = (random.randint(0, GRID_WIDTH - 1), random.randint(0, GRID_HEIGHT - 1))
-            self.active = True
-            self.spawn_time = pygame.time.get_ticks()
+    def draw_cell(self, game, screen_position):
+        # 蛇身已经在 body_layer 上，这里只画食物
+        position = self.to_world(game, screen_position)
+        if position == game.food.position:
+            draw_food(self.screen, screen_position)
+        if game.special_food.active and position == game.special_food.position:
+            draw_special_food(self.screen, screen_position)
             
-    def update(self):
-        if self.active:
-            current_time = pygame.time.get_ticks()
-            if current_time - self.spawn_time > self.duration:
-                self.active = False
+    def restore(self, game, rect):
+        # 用蛇身层盖住 rect，再重画与之相交的食物格子
+        self.screen.blit(self.body_layer, rect, rect)
+        area = rect.clip(PLAY_RECT)
+        if area.width == 0 or area.height == 0:
+            return
+        for y in range(area.top // GRID_SIZE, (area.bottom - 1) // GRID_SIZE + 1):
+            for x in range(area.left // GRID_SIZE, (area.right - 1) // GRID_SIZE + 1):
+                self.draw_cell(game, (x, y))
                 
-    def draw(self, surface):
-        if self.active:
-            r = pygame.Rect((self.position[0] * GRID_SIZE, self.position[1] * GRID_SIZE), (GRID_SIZE, GRID_SIZE))
-            pygame.draw.rect(surface, GOLD, r)
-            pygame.draw.rect(surface, WHITE, r, 1)
+    def render(self, game, texts, panel_key, draw_panel):
+        if self.layout != self.screen.get_size():
+            self.layout = self.screen.get_size()
+            self.background = build_background(self.resources)
+            self.full_redraw = True
             
-            # 绘制闪烁效果
-            if (pygame.time.get_ticks() // 200) % 2 == 0:
-                pygame.draw.circle(surface, ORANGE, r.center, GRID_SIZE // 2, 2)
-
-def draw_grid(surface):
-    for y in range(0, HEIGHT, GRID_SIZE):
-        for x in range(0, WIDTH - 100, GRID_SIZE):
-            r = pygame.Rect((x, y), (GRID_SIZE, GRID_SIZE))
-            pygame.draw.rect(surface, GRAY, r, 1)
+        if self.full_redraw:
+            self.body_layer = self.background.copy()
+            self.draw_body(game, self.body_layer)
+            self.screen.blit(self.body_layer, (0, 0))
+            food_position = self.to_screen(game, game.food.position)
+            if food_position is not None:
+                draw_food(self.screen, food_position)
+            if game.special_food.active:
+                special_position = self.to_screen(game, game.special_food.position)
+                if special_position is not None:
+                    draw_special_food(self.screen, special_position)
+            draw_panel(self.screen)
+            for surface, rect in texts:
+                self.screen.blit(surface, rect)
+            if self.profiler is not None:
+                self.profiler.mark("draw")
+            pygame.display.update()
+            if self.profiler is not None:
+                self.profiler.mark("update")
+            self.full_redraw = False
+            self.dirty_cells.clear()
+            self.text_rects = [rect for _, rect in texts]
+            self.panel_key = panel_key
+            return
+        
+        # 特殊食物闪烁，每帧都要重画
+        if game.special_food.active:
+            special_position = self.to_screen(game, game.special_food.position)
+            if special_position is not None:
+                self.dirty_cells.add(special_position)
+        
+        rects = []
+        for position in self.dirty_cells:
+            # 多留一像素，特殊食物的闪烁圆圈会略微超出格子
+            r = cell_rect(position).inflate(2, 2)
+            self.restore(game, r)
+            rects.append(r)
+        self.dirty_cells.clear()
+        
+        # 上一帧和这一帧的文字区域都先恢复，再统一画文字
+        new_text_rects = [rect for _, rect in texts]
+        for r in self.text_rects + new_text_rects:
+            self.restore(game, r)
+            rects.append(r)
+        for surface, rect in texts:
+            self.screen.blit(surface, rect)
+        self.text_rects = new_text_rects
+        
+        if panel_key != self.panel_key:
+            self.screen.blit(self.background, PANEL_RECT, PANEL_RECT)
+            draw_panel(self.screen)
+            rects.append(PANEL_RECT)
+            self.panel_key = panel_key
+            
+        if self.profiler is not None:
+            self.profiler.mark("draw")
+        pygame.display.update(rects)
+        if self.profiler is not None:
+            self.profiler.mark("update")
 
-def main():
+def main(record_path=None, profile_path=None, world_size=None):
     # 初始化游戏窗口
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption('贪吃蛇游戏')
     clock = pygame.time.Clock()
     
-    # 创建蛇和食物
-    snake = Snake()
-    food = Food()
-    special_food = SpecialFood()
+    # 创建游戏逻辑（蛇和食物）
+    if world_size:
+        game = SnakeGame(world_size, world_size, random.Random(), BUCKET_SIZE)
+    else:
+        game = SnakeGame(GRID_WIDTH, GRID_HEIGHT, random.Random())
+    # 录制模式：记录第一局的种子和转向，游戏结束、重启或退出时写入结尾
+    recorder = ReplayRecorder(record_path, game, new_seed()) if record_path else None
+    snake = game.snake
+    
+    # 字体和文字缓存
+    resources = Resources()
+    print(f"字体加载耗时: {resources.font_load_time * 1000:.1f} ms")
     
     # 创建按钮
-    pause_button = Button(WIDTH - 90, 20, 70, 30, "暂停P", LIGHT_GRAY, WHITE)
-    resume_button = Button(WIDTH - 90, 60, 70, 30, "继续P", LIGHT_GRAY, WHITE)
-    restart_button = Button(WIDTH - 90, 100, 70, 30, "重启R", LIGHT_GRAY, WHITE)
+    pause_button = Button(WIDTH - 90, 20, 70, 30, "暂停P", LIGHT_GRAY, WHITE, resources)
+    resume_button = Button(WIDTH - 90, 60, 70, 30, "继续P", LIGHT_GRAY, WHITE, resources)
+    restart_button = Button(WIDTH - 90, 100, 70, 30, "重启R", LIGHT_GRAY, WHITE, resources)
     
     # 创建速度滑动条
     speed_slider = Slider(WIDTH - 90, 450, 70, 10, MIN_FPS, MAX_FPS, INITIAL_FPS)
     current_fps = INITIAL_FPS
+    accumulator = 0.0
     
     # 颜色选项
     color_options = [
@@ -353,14 +457,21 @@ def main():
         ColorOption(WIDTH - 60, 360, 20, GREEN)
     ]
     
-    # 字体
-    font = pygame.font.SysFont('microsoftyahei', 20)
-    title_font = pygame.font.SysFont('microsoftyahei', 16, bold=True)
-    bonus_font = pygame.font.SysFont('microsoftyahei', 24, bold=True)
+    # 性能统计：F3键开关，--profile 时从一开始就记录并在退出时写出每帧数据
+    profiler = FrameProfiler(enabled=profile_path is not None, keep_frames=profile_path is not None)
+    profile_lines = []
+    frame_count = 0
+    game.profiler = profiler
+    
+    renderer = Renderer(screen, resources, profiler)
+    renderer.follow(game)
+    
+    # 自动驾驶：A键开关，第一次打开时才创建
+    autopilot = None
+    autopilot_on = False
     
     # 游戏状态
     paused = False
-    game_over = False
     bonus_message = ""
     bonus_timer = 0
     
@@ -370,25 +481,37 @@ def main():
         
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                if recorder is not None:
+                    recorder.close()
+                if profile_path is not None:
+                    profiler.dump(profile_path)
                 pygame.quit()
                 sys.exit()
             elif event.type == pygame.KEYDOWN:
-                if not paused and not game_over:
+                if event.key == pygame.K_F3:  # F3键显示/隐藏性能统计
+                    profiler.toggle()
+                elif event.key == pygame.K_a:  # A键开关自动驾驶
+                    if autopilot is None:
+                        autopilot = Autopilot(game)
+                    autopilot_on = not autopilot_on
+                elif not paused and not game.game_over:
                     if event.key == pygame.K_UP:
-                        snake.turn(UP)
+                        game.queue_turn(UP)
                     elif event.key == pygame.K_DOWN:
-                        snake.turn(DOWN)
+                        game.queue_turn(DOWN)
                     elif event.key == pygame.K_LEFT:
-                        snake.turn(LEFT)
+                        game.queue_turn(LEFT)
                     elif event.key == pygame.K_RIGHT:
-                        snake.turn(RIGHT)
+                        game.queue_turn(RIGHT)
                     elif event.key == pygame.K_p:  # P键暂停
                         paused = True
                 elif event.key == pygame.K_r:  # R键重启
-                    snake.reset()
-                    food.randomize_position()
-                    special_food.active = False
-                    game_over = False
+                    if recorder is not None:
+                        recorder.close()
+                        recorder = None
+                    game.reset()
+                    renderer.invalidate()
+                    renderer.follow(game)
                     paused = False
             
             # 检查按钮点击
@@ -397,23 +520,27 @@ def main():
             if resume_button.is_clicked(mouse_pos, event):
                 paused = False
             if restart_button.is_clicked(mouse_pos, event):
-                snake.reset()
-                food.randomize_position()
-                special_food.active = False
-                game_over = False
+                if recorder is not None:
+                    recorder.close()
+                    recorder = None
+                game.reset()
+                renderer.invalidate()
+                renderer.follow(game)
                 paused = False
                 
             # 检查颜色选项点击
             for i, option in enumerate(color_options):
                 if option.is_clicked(mouse_pos, event):
-                    snake.color = option.color
+                    renderer.snake_color = option.color
+                    renderer.invalidate()
                     for opt in color_options:
                         opt.selected = False
                     option.selected = True
                     
             for i, option in enumerate(head_color_options):
                 if option.is_clicked(mouse_pos, event):
-                    snake.head_color = option.color
+                    renderer.snake_head_color = option.color
+                    renderer.invalidate()
                     for opt in head_color_options:
                         opt.selected = False
                     option.selected = True
@@ -422,33 +549,34 @@ def main():
             if speed_slider.handle_event(event, mouse_pos):
                 current_fps = speed_slider.value
         
-        # 更新S形奖励状态
-        snake.update_s_shape_status()
-        
-        # 更新特殊食物
-        special_food.update()
-        if not paused and not game_over:
-            special_food.try_spawn()
-        
-        # 移动蛇（如果没有暂停且游戏没有结束）
-        if not paused and not game_over:
-            if not snake.move():
-                game_over = True
-        
-        # 检查是否吃到普通食物
-        if not paused and not game_over and snake.get_head_position() == food.position:
-            snake.grow()
-            food.randomize_position()
-            # 确保食物不出现在蛇身上
-            while food.position in snake.positions:
-                food.randomize_position()
-        
-        # 检查是否吃到特殊食物
-        if not paused and not game_over and special_food.active and snake.get_head_position() == special_food.position:
-            snake.score += 50  # 特殊食物奖励
-            special_food.active = False
-            bonus_message = "特殊食物 +50分!"
-            bonus_timer = pygame.time.get_ticks()
+        profiler.mark("events")
+        
+        # 固定步长推进游戏逻辑（如果没有暂停且游戏没有结束）
+        if not paused and not game.game_over:
+            step_time = 1 / current_fps
+            steps = 0
+            while accumulator >= step_time and not game.game_over:
+                accumulator -= step_time
+                before = renderer.snapshot(game)
+                events = game.step(autopilot.next_direction() if autopilot_on else None)
+                if EVENT_DEAD in events:
+                    renderer.invalidate()
+                else:
+                    renderer.mark_changes(game, before)
+                renderer.follow(game)
+                if EVENT_SPECIAL in events:
+                    bonus_message = "特殊食物 +50分!"
+                    bonus_timer = pygame.time.get_ticks()
+                steps += 1
+                if steps == MAX_STEPS_PER_FRAME:
+                    accumulator = 0.0
+            if recorder is not None and game.game_over:
+                recorder.close()
+                recorder = None
+        else:
+            accumulator = 0.0
+        
+        profiler.mark("logic")
         
         # 检查奖励消息显示时间
         current_time = pygame.time.get_ticks()
@@ -456,110 +584,102 @@ def main():
             bonus_message = ""
         
         # 绘制游戏界面
-        screen.fill(BLACK)
-        draw_grid(screen)
-        snake.draw(screen)
-        food.draw(screen)
-        special_food.draw(screen)
-        
-        # 绘制控制面板背景
-        panel_rect = pygame.Rect(WIDTH - 100, 0, 100, HEIGHT)
-        pygame.draw.rect(screen, (50, 50, 50), panel_rect)
-        pygame.draw.line(screen, WHITE, (WIDTH - 100, 0), (WIDTH - 100, HEIGHT), 2)
-        
-        # 显示分数和长度
-        score_surface = font.render(f'得分: {snake.score}', True, WHITE)
-        score_rect = score_surface.get_rect()
-        score_rect.topleft = (10, 10)
-        screen.blit(score_surface, score_rect)
-        
-        length_surface = font.render(f'长度: {snake.grow_to}', True, WHITE)
-        length_rect = length_surface.get_rect()
-        length_rect.topleft = (10, 40)
-        screen.blit(length_surface, length_rect)
-        
-        # 显示S形奖励状态
-        s_shape_status = "可用" if snake.s_shape_bonus_available else "冷却中"
-        s_shape_color = GREEN if snake.s_shape_bonus_available else RED
-        s_shape_surface = font.render(f'S形奖励: {s_shape_status}', True, s_shape_color)
-        s_shape_rect = s_shape_surface.get_rect()
-        s_shape_rect.topleft = (10, 70)
-        screen.blit(s_shape_surface, s_shape_rect)
-        
-        # 绘制按钮
         pause_button.is_hovered(mouse_pos)
         resume_button.is_hovered(mouse_pos)
         restart_button.is_hovered(mouse_pos)
         
-        pause_button.draw(screen)
-        resume_button.draw(screen)
-        restart_button.draw(screen)
-        
-        # 绘制颜色选择标题
-        color_title = title_font.render("身体颜色:", True, WHITE)
-        screen.blit(color_title, (WIDTH - 90, 160))
-        
-        head_color_title = title_font.render("头部颜色:", True, WHITE)
-        screen.blit(head_color_title, (WIDTH - 90, 280))
-        
-        # 绘制颜色选项
-        for option in color_options:
-            option.draw(screen)
+        def draw_panel(surface):
+            # 绘制按钮
+            pause_button.draw(surface)
+            resume_button.draw(surface)
+            restart_button.draw(surface)
             
-        for option in head_color_options:
-            option.draw(screen)
+            # 绘制颜色选项
+            for option in color_options:
+                option.draw(surface)
+                
+            for option in head_color_options:
+                option.draw(surface)
+            
+            # 绘制速度滑动条和标签
+            speed_slider.draw(surface)
+            
+            speed_text = resources.text('normal', f"{current_fps} FPS", WHITE)
+            surface.blit(speed_text, (WIDTH - 90, 470))
         
-        # 绘制速度滑动条和标签
-        speed_title = title_font.render("游戏速度:", True, WHITE)
-        screen.blit(speed_title, (WIDTH - 90, 430))
+        # 面板上的控件状态不变时不用重画
+        panel_key = (pause_button.current_color, resume_button.current_color, restart_button.current_color,
+                     speed_slider.handle_pos, current_fps)
         
-        speed_slider.draw(screen)
+        texts = []
         
-        speed_text = font.render(f"{current_fps} FPS", True, WHITE)
-        screen.blit(speed_text, (WIDTH - 90, 470))
+        # 显示分数和长度
+        score_surface = resources.text('normal', f'得分: {snake.score}', WHITE)
+        texts.append((score_surface, score_surface.get_rect(topleft=(10, 10))))
         
-        # 显示S形奖励说明
-        s_shape_help = title_font.render("S形奖励100分", True, GOLD)
-        screen.blit(s_shape_help, (WIDTH - 90, 500))
+        length_surface = resources.text('normal', f'长度: {snake.grow_to}', WHITE)
+        texts.append((length_surface, length_surface.get_rect(topleft=(10, 40))))
         
-        special_food_help = title_font.render("金色食物50分", True, ORANGE)
-        screen.blit(special_food_help, (WIDTH - 90, 520))
+        # 显示S形奖励状态
+        s_shape_status = "可用" if snake.s_shape_bonus_available else "冷却中"
+        s_shape_color = GREEN if snake.s_shape_bonus_available else RED
+        s_shape_surface = resources.text('normal', f'S形奖励: {s_shape_status}', s_shape_color)
+        texts.append((s_shape_surface, s_shape_surface.get_rect(topleft=(10, 70))))
+        
+        if autopilot_on:
+            autopilot_surface = resources.text('normal', "自动驾驶中 (A键关闭)", CYAN)
+            texts.append((autopilot_surface, autopilot_surface.get_rect(topleft=(10, 100))))
         
         # 如果游戏暂停，显示暂停文本
-        if paused and not game_over:
-            pause_text = font.render("游戏已暂停", True, WHITE)
-            pause_rect = pause_text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
-            screen.blit(pause_text, pause_rect)
+        if paused and not game.game_over:
+            pause_text = resources.text('normal', "游戏已暂停", WHITE)
+            texts.append((pause_text, pause_text.get_rect(center=(WIDTH // 2, HEIGHT // 2))))
         
         # 如果游戏结束，显示游戏结束文本
-        if game_over:
-            game_over_font = pygame.font.SysFont('microsoftyahei', 40)
-            game_over_text = game_over_font.render("游戏结束!", True, RED)
-            game_over_rect = game_over_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 30))
-            screen.blit(game_over_text, game_over_rect)
+        if game.game_over:
+            if game.won:
+                game_over_text = resources.text('game_over', "你赢了!", GOLD)
+            else:
+                game_over_text = resources.text('game_over', "游戏结束!", RED)
+            texts.append((game_over_text, game_over_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 30))))
             
-            score_text = font.render(f"最终得分: {snake.score}", True, WHITE)
-            score_rect = score_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 20))
-            screen.blit(score_text, score_rect)
+            score_text = resources.text('normal', f"最终得分: {game.final_score}", WHITE)
+            texts.append((score_text, score_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 20))))
             
-            restart_text = font.render("按R键或点击重启按钮重新开始", True, WHITE)
-            restart_rect = restart_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 60))
-            screen.blit(restart_text, restart_rect)
+            restart_text = resources.text('normal', "按R键或点击重启按钮重新开始", WHITE)
+            texts.append((restart_text, restart_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 60))))
         
         # 显示奖励消息
         if bonus_message:
-            bonus_surface = bonus_font.render(bonus_message, True, GOLD)
-            bonus_rect = bonus_surface.get_rect(center=(WIDTH // 2, 50))
-            screen.blit(bonus_surface, bonus_rect)
+            bonus_surface = resources.text('bonus', bonus_message, GOLD)
+            texts.append((bonus_surface, bonus_surface.get_rect(center=(WIDTH // 2, 50))))
         
         # 显示S形奖励消息
         if snake.s_shape_bonus_claimed:
-            s_bonus_surface = bonus_font.render("S形奖励 +100分!", True, GOLD)
-            s_bonus_rect = s_bonus_surface.get_rect(center=(WIDTH // 2, 50 if not bonus_message else 80))
-            screen.blit(s_bonus_surface, s_bonus_rect)
-        
-        pygame.display.update()
-        clock.tick(current_fps)
+            s_bonus_surface = resources.text('bonus', "S形奖励 +100分!", GOLD)
+            texts.append((s_bonus_surface, s_bonus_surface.get_rect(center=(WIDTH // 2, 50 if not bonus_message else 80))))
+        
+        # 显示性能统计，每 30 帧刷新一次数字
+        if profiler.enabled:
+            frame_count += 1
+            if frame_count % 30 == 1:
+                profile_lines = profiler.summary_lines()
+            for i, line in enumerate(profile_lines):
+                line_surface = resources.text('title', line, CYAN)
+                texts.append((line_surface, line_surface.get_rect(bottomleft=(10, HEIGHT - 10 - 20 * (len(profile_lines) - 1 - i)))))
+        
+        profiler.mark("hud")
+        renderer.render(game, texts, panel_key, draw_panel)
+        accumulator += clock.tick(RENDER_FPS) / 1000
+        profiler.mark("wait")
+        profiler.end_frame()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="贪吃蛇游戏")
+    parser.add_argument("--record", metavar="FILE", help="把第一局录制成回放文件，用 snake_replay.py 重放")
+    parser.add_argument("--profile", metavar="FILE", help="记录每帧各阶段耗时，退出时写入 FILE（.json 或 .csv）")
+    parser.add_argument("--world", metavar="N", type=int, help="大地图模式：N x N 格的世界，视口跟随蛇头")
+    args = parser.parse_args()
+    if args.world is not None and args.world < max(GRID_WIDTH, GRID_HEIGHT):
+        parser.error(f"--world 不能小于窗口的 {max(GRID_WIDTH, GRID_HEIGHT)} 格")
+    main(args.record, args.profile, args.world)
\ No newline at end of file
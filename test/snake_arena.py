@@ -0,0 +1,391 @@
+import argparse
+import asyncio
+import random
+import struct
+import time
+from array import array
+from collections import deque
+
+from snake_core import DIRECTIONS, FOOD_SCORE, TURN_QUEUE_SIZE, FreeCells
+
+# 共享网格中的取值：>= 0 是蛇的编号
+EMPTY = -1
+FOOD = -2
+
+# 消息都是 长度(u32) + 类型(1 字节) + 内容，整数小端
+MSG_JOIN = b"J"      # 分配给客户端的蛇编号 u32
+MSG_SNAPSHOT = b"S"  # 完整状态，客户端加入时发送一次
+MSG_DELTA = b"D"     # 每个 tick 的增量
+MSG_END = b"E"       # 服务器停止
+FRAME = struct.Struct("<I")
+DELTA_HEADER = struct.Struct("<IHHHH")  # tick, 移动数, 死亡数, 出生数, 食物变化数
+MOVE = struct.Struct("<IIB")            # 蛇编号, 新蛇头格子, 是否去掉了蛇尾
+DEATH = struct.Struct("<I")
+SPAWN = struct.Struct("<II")
+FOOD_CHANGE = struct.Struct("<IB")      # 格子, 1 出现 / 0 消失
+SNAPSHOT_HEADER = struct.Struct("<IHHH")
+SNAKE_HEADER = struct.Struct("<II")
+
+class ArenaSnake:
+    def __init__(self, snake_id, bot):
+        self.id = snake_id
+        self.bot = bot
+        self.body = deque()
+        self.direction = 0
+        self.turns = deque()
+        self.grow_to = 3
+        self.score = 0
+
+class Arena:
+    """多条蛇共用一张棋盘。
+
+    grid 记录每个格子属于哪条蛇（或者是食物），所以碰撞检测对每条蛇都是 O(1)，
+    一个 tick 的代价只和蛇的数量有关，与蛇的长度无关。碰撞按 tick 开始时的网格判断：
+    撞到任何蛇身（包括正要移走的蛇尾）都会死，两个蛇头抢同一格则一起死。死掉的机器人蛇
+    立即在随机空格子重生。每个 tick 的变化记录下来，由 encode_delta() 编码后广播。
+    """
+    def __init__(self, width=200, height=200, num_food=200, seed=None):
+        self.width = width
+        self.height = height
+        self.num_cells = width * height
+        self.num_food = num_food
+        self.rng = random.Random(seed)
+        self.grid = array("i", [EMPTY]) * self.num_cells
+        self.free_cells = FreeCells(self.num_cells)
+        self.snakes = {}
+        self.next_id = 0
+        self.food = set()
+        self.tick = 0
+        self.clear_delta()
+        self.refill_food()
+
+    def clear_delta(self):
+        self.moves = []
+        self.deaths = []
+        self.spawns = []
+        self.food_changes = []
+
+    def next_cell(self, cell, direction):
+        dx, dy = DIRECTIONS[direction]
+        return ((cell // self.width + dy) % self.height) * self.width + (cell % self.width + dx) % self.width
+
+    def refill_food(self):
+        while len(self.food) < self.num_food:
+            cell = self.free_cells.sample(self.rng)
+            if cell is None:
+                return
+            self.free_cells.remove(cell)
+            self.grid[cell] = FOOD
+            self.food.add(cell)
+            self.food_changes.append((cell, 1))
+
+    def spawn(self, snake):
+        cell = self.free_cells.sample(self.rng)
+        if cell is None:
+            return False
+        self.free_cells.remove(cell)
+        self.grid[cell] = snake.id
+        snake.body = deque([cell])
+        snake.direction = self.rng.randrange(len(DIRECTIONS))
+        snake.turns.clear()
+        snake.grow_to = 3
+        snake.score = 0
+        self.spawns.append((snake.id, cell))
+        return True
+
+    def clear_body(self, snake):
+        for cell in snake.body:
+            self.grid[cell] = EMPTY
+            self.free_cells.add(cell)
+        snake.body.clear()
+        self.deaths.append(snake.id)
+
+    def add_snake(self, bot=False):
+        snake = ArenaSnake(self.next_id, bot)
+        self.next_id += 1
+        self.snakes[snake.id] = snake
+        self.spawn(snake)
+        return snake
+
+    def remove_snake(self, snake_id):
+        snake = self.snakes.pop(snake_id)
+        self.clear_body(snake)
+
+    def queue_turn(self, snake_id, direction):
+        # 和 SnakeGame.queue_turn 相同：按顺序缓存，丢掉重复和掉头
+        snake = self.snakes.get(snake_id)
+        if snake is None or not 0 <= direction < len(DIRECTIONS):
+            return
+        last = snake.turns[-1] if snake.turns else snake.direction
+        dx, dy = DIRECTIONS[last]
+        if direction == last or DIRECTIONS[direction] == (-dx, -dy):
+            return
+        if len(snake.turns) < TURN_QUEUE_SIZE:
+            snake.turns.append(direction)
+
+    def bot_turn(self, snake):
+        # 简单机器人：偶尔随机转向，前方是蛇身时换一个能走的方向
+        head = snake.body[0]
+        grid = self.grid
+        if grid[self.next_cell(head, snake.direction)] < 0 and self.rng.random() > 0.1:
+            return
+        dx, dy = DIRECTIONS[snake.direction]
+        options = [d for d in range(len(DIRECTIONS))
+                   if DIRECTIONS[d] != (-dx, -dy) and grid[self.next_cell(head, d)] < 0]
+        if options:
+            snake.direction = self.rng.choice(options)
+
+    def step(self):
+        self.tick += 1
+        grid = self.grid
+
+        # 先按 tick 开始时的网格决定每条蛇的去向
+        targets = {}
+        for snake in self.snakes.values():
+            if not snake.body:
+                continue
+            if snake.bot:
+                self.bot_turn(snake)
+            elif snake.turns:
+                snake.direction = snake.turns.popleft()
+            cell = self.next_cell(snake.body[0], snake.direction)
+            targets.setdefault(cell, []).append(snake)
+
+        # 所有死亡都按 tick 开始时的网格判断完，再移动活下来的蛇，结果与处理顺序无关
+        dead = []
+        moving = []
+        for cell, snakes in targets.items():
+            if len(snakes) > 1 or grid[cell] >= 0:
+                dead.extend(snakes)
+            else:
+                moving.append((cell, snakes[0]))
+
+        for cell, snake in moving:
+            if grid[cell] == FOOD:
+                self.food.discard(cell)
+                self.food_changes.append((cell, 0))
+                snake.grow_to += 1
+                snake.score += FOOD_SCORE
+            else:
+                self.free_cells.remove(cell)
+            grid[cell] = snake.id
+            snake.body.appendleft(cell)
+            popped = len(snake.body) > snake.grow_to
+            if popped:
+                tail = snake.body.pop()
+                grid[tail] = EMPTY
+                self.free_cells.add(tail)
+            self.moves.append((snake.id, cell, popped))
+
+        for snake in dead:
+            self.clear_body(snake)
+            self.spawn(snake)
+        self.refill_food()
+
+    def encode_delta(self):
+        parts = [MSG_DELTA, DELTA_HEADER.pack(self.tick, len(self.moves), len(self.deaths),
+                                              len(self.spawns), len(self.food_changes))]
+        parts.extend(MOVE.pack(*move) for move in self.moves)
+        parts.extend(DEATH.pack(snake_id) for snake_id in self.deaths)
+        parts.extend(SPAWN.pack(*spawn) for spawn in self.spawns)
+        parts.extend(FOOD_CHANGE.pack(*change) for change in self.food_changes)
+        self.clear_delta()
+        return b"".join(parts)
+
+    def encode_snapshot(self):
+        parts = [MSG_SNAPSHOT, SNAPSHOT_HEADER.pack(self.tick, self.width, self.height, len(self.snakes))]
+        for snake in self.snakes.values():
+            parts.append(SNAKE_HEADER.pack(snake.id, len(snake.body)))
+            parts.append(struct.pack(f"<{len(snake.body)}I", *snake.body))
+        parts.append(FRAME.pack(len(self.food)))
+        parts.append(struct.pack(f"<{len(self.food)}I", *self.food))
+        return b"".join(parts)
+
+class ArenaMirror:
+    """客户端按快照和增量重建的棋盘，用来画面显示或校验"""
+    def __init__(self):
+        self.tick = 0
+        self.grid = None
+        self.bodies = {}
+
+    def apply(self, message):
+        kind, payload = message[:1], memoryview(message)[1:]
+        if kind == MSG_SNAPSHOT:
+            self.apply_snapshot(payload)
+        elif kind == MSG_DELTA:
+            self.apply_delta(payload)
+
+    def apply_snapshot(self, payload):
+        self.tick, self.width, self.height, count = SNAPSHOT_HEADER.unpack_from(payload, 0)
+        offset = SNAPSHOT_HEADER.size
+        self.grid = array("i", [EMPTY]) * (self.width * self.height)
+        self.bodies = {}
+        for _ in range(count):
+            snake_id, length = SNAKE_HEADER.unpack_from(payload, offset)
+            offset += SNAKE_HEADER.size
+            body = deque(struct.unpack_from(f"<{length}I", payload, offset))
+            offset += 4 * length
+            self.bodies[snake_id] = body
+            for cell in body:
+                self.grid[cell] = snake_id
+        (count,) = FRAME.unpack_from(payload, offset)
+        for cell in struct.unpack_from(f"<{count}I", payload, offset + FRAME.size):
+            self.grid[cell] = FOOD
+
+    def clear(self, snake_id):
+        for cell in self.bodies.pop(snake_id, ()):
+            self.grid[cell] = EMPTY
+
+    def apply_delta(self, payload):
+        self.tick, moves, deaths, spawns, food_changes = DELTA_HEADER.unpack_from(payload, 0)
+        grid = self.grid
+        offset = DELTA_HEADER.size
+        for snake_id, cell, popped in MOVE.iter_unpack(payload[offset:offset + moves * MOVE.size]):
+            body = self.bodies[snake_id]
+            body.appendleft(cell)
+            grid[cell] = snake_id
+            if popped:
+                grid[body.pop()] = EMPTY
+        offset += moves * MOVE.size
+        for (snake_id,) in DEATH.iter_unpack(payload[offset:offset + deaths * DEATH.size]):
+            self.clear(snake_id)
+        offset += deaths * DEATH.size
+        for snake_id, cell in SPAWN.iter_unpack(payload[offset:offset + spawns * SPAWN.size]):
+            self.clear(snake_id)
+            self.bodies[snake_id] = deque([cell])
+            grid[cell] = snake_id
+        offset += spawns * SPAWN.size
+        for cell, added in FOOD_CHANGE.iter_unpack(payload[offset:offset + food_changes * FOOD_CHANGE.size]):
+            if added:
+                grid[cell] = FOOD
+            elif grid[cell] == FOOD:
+                grid[cell] = EMPTY
+
+def frame(message):
+    return FRAME.pack(len(message)) + message
+
+async def read_frame(reader):
+    (length,) = FRAME.unpack(await reader.readexactly(FRAME.size))
+    return await reader.readexactly(length)
+
+class ArenaServer:
+    """权威的 tick 循环：固定频率推进 Arena，把增量广播给所有连接的客户端。
+
+    客户端发来的每个字节是一次转向（方向编号）。写缓冲积压超过 max_backlog 的慢客户端会被断开，
+    不会拖慢 tick。
+    """
+    def __init__(self, arena, tick_rate=20, max_backlog=1 << 20):
+        self.arena = arena
+        self.tick_period = 1 / tick_rate
+        self.max_backlog = max_backlog
+        self.clients = {}
+        self.tick_times = []
+        self.bytes_sent = 0
+        self.running = False
+
+    async def handle_client(self, reader, writer):
+        snake = self.arena.add_snake()
+        self.clients[writer] = snake.id
+        writer.write(frame(MSG_JOIN + struct.pack("<I", snake.id)))
+        writer.write(frame(self.arena.encode_snapshot()))
+        try:
+            while True:
+                data = await reader.read(64)
+                if not data:
+                    break
+                for direction in data:
+                    self.arena.queue_turn(snake.id, direction)
+        except ConnectionError:
+            pass
+        finally:
+            self.drop(writer)
+
+    def drop(self, writer):
+        snake_id = self.clients.pop(writer, None)
+        if snake_id is not None and snake_id in self.arena.snakes:
+            self.arena.remove_snake(snake_id)
+        writer.close()
+
+    def broadcast(self, message):
+        data = frame(message)
+        for writer in list(self.clients):
+            if writer.transport.get_write_buffer_size() > self.max_backlog:
+                self.drop(writer)
+                continue
+            writer.write(data)
+            self.bytes_sent += len(data)
+
+    async def run(self, ticks):
+        # 按绝对时间排下一个 tick，避免 sleep 误差累积
+        loop = asyncio.get_running_loop()
+        next_time = loop.time()
+        self.running = True
+        for _ in range(ticks):
+            start = time.perf_counter()
+            # 两个 tick 之间有客户端加入或离开时，先把这些变化单独发出去，
+            # 保证客户端先看到蛇的出生和消失，再应用这个 tick 的移动
+            if self.arena.spawns or self.arena.deaths:
+                self.broadcast(self.arena.encode_delta())
+            self.arena.step()
+            self.broadcast(self.arena.encode_delta())
+            self.tick_times.append(time.perf_counter() - start)
+            next_time += self.tick_period
+            await asyncio.sleep(max(0.0, next_time - loop.time()))
+        self.running = False
+        self.broadcast(MSG_END)
+
+async def scripted_client(host, port, seed):
+    """脚本客户端：镜像服务器状态并随机转向，收到 MSG_END 后返回镜像"""
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    mirror = ArenaMirror()
+    message = await read_frame(reader)
+    (snake_id,) = struct.unpack("<I", message[1:])
+    while True:
+        message = await read_frame(reader)
+        if message[:1] == MSG_END:
+            break
+        mirror.apply(message)
+        if message[:1] == MSG_DELTA and rng.random() < 0.2:
+            writer.write(bytes([rng.randrange(len(DIRECTIONS))]))
+    writer.close()
+    return snake_id, mirror
+
+async def demo(args):
+    arena = Arena(args.size, args.size, num_food=args.size, seed=0)
+    for _ in range(args.bots):
+        arena.add_snake(bot=True)
+    server = ArenaServer(arena, args.tick_rate)
+    listener = await asyncio.start_server(server.handle_client, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    clients = [asyncio.create_task(scripted_client("127.0.0.1", port, seed)) for seed in range(args.clients)]
+    await asyncio.sleep(0.1)
+
+    ticks = int(args.seconds * args.tick_rate)
+    start = time.perf_counter()
+    await server.run(ticks)
+    elapsed = time.perf_counter() - start
+    # 客户端断开时会删掉自己的蛇，先留一份最终网格
+    final_grid = array("i", arena.grid)
+    mirrors = await asyncio.gather(*clients)
+
+    # 服务器停止 tick 后，所有客户端的镜像都应与服务器完全一致
+    consistent = all(mirror.grid == final_grid for _, mirror in mirrors)
+    listener.close()
+    await listener.wait_closed()
+
+    times = sorted(server.tick_times)
+    print(f"{len(arena.snakes)} 条蛇, {args.clients} 个客户端, {args.size}x{args.size} 棋盘")
+    print(f"{ticks} ticks 用时 {elapsed:.2f} s, 实际 {ticks / elapsed:.1f} ticks/s (目标 {args.tick_rate})")
+    print(f"每 tick 计算: 平均 {sum(times) / len(times) * 1e3:.2f} ms, p99 {times[len(times) * 99 // 100] * 1e3:.2f} ms")
+    print(f"每 tick 每客户端 {server.bytes_sent / max(1, ticks * args.clients):.0f} 字节")
+    print("客户端镜像一致" if consistent else "客户端镜像不一致!")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多蛇竞技场：本机 asyncio 服务器 + 脚本客户端")
+    parser.add_argument("--bots", type=int, default=300)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--size", type=int, default=200)
+    parser.add_argument("--tick-rate", type=float, default=20)
+    parser.add_argument("--seconds", type=float, default=5)
+    asyncio.run(demo(parser.parse_args()))
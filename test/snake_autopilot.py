@@ -0,0 +1,336 @@
+import random
+import time
+from array import array
+from collections import deque
+
+from snake_core import SnakeGame, DIRECTIONS
+
+def cycle_step(x, y, width, height):
+    # height 为偶数：第 0 列留作回程，其余列逐行来回走
+    if x == 0:
+        if y > 0:
+            return 0, y - 1
+        return (1, 0) if width > 1 else (0, height - 1)
+    if y % 2 == 0:
+        return (x + 1, y) if x < width - 1 else (x, y + 1)
+    if x > 1:
+        return x - 1, y
+    return (1, y + 1) if y < height - 1 else (0, y)
+
+def cycle_next(cell, width, height):
+    """沿一条经过所有格子的哈密顿回路，cell 的下一个格子。按坐标现算，不建表；宽高都是奇数时没有这样的回路"""
+    x, y = cell % width, cell // width
+    if height % 2 == 0:
+        x, y = cycle_step(x, y, width, height)
+    else:
+        y, x = cycle_step(y, x, height, width)
+    return y * width + x
+
+class Autopilot:
+    """自动玩 snake_core.SnakeGame。
+
+    - A* 找到食物的最短路（环形棋盘上的曼哈顿距离做启发），并模拟走完后检查蛇头还能到达
+      蛇尾（见 safe_after），食物没动时直接沿上次的路径走，不重新搜索。检查只针对当前这颗
+      食物，之后刷出的食物如果正好挡在去蛇尾的路上，仍然可能被困住。
+    - 找不到安全路径时绕着蛇尾走，尽量挑离蛇尾远、走完仍然安全的格子；如果绕了很久
+      （stall_limit 步）还没吃到食物，就放弃安全检查直接去吃，避免永远兜圈子，这是唯一
+      会主动冒险的情况。
+    - 蛇身超过 hamilton_threshold 比例的棋盘时沿哈密顿回路走：模拟一直沿回路走到整条蛇
+      都排上回路（cycle_entry_safe），或者这一步走完仍能到达蛇尾时才走回路；整条蛇都排在
+      回路上以后，每步只需算一次回路上的下一格。
+    每次 next_direction() 里所有搜索加起来最多展开 search_budget 个格子，大地图
+    （snake4.py --world）上一步的耗时也有上限：去食物的路超出预算时当作没找到，去蛇尾的路
+    超出预算时当作安全，所以大地图上的安全检查只是近似的；小棋盘一般用不完预算。
+    邻居和回路都按坐标现算，搜索用的 seen/parent/dist 是按格子数分配的 array，用递增的
+    stamp 区分每次搜索，不需要清零。
+    """
+    def __init__(self, game, hamilton_threshold=0.5, search_budget=2000):
+        self.game = game
+        self.width = game.width
+        self.height = game.height
+        self.num_cells = game.width * game.height
+        self.has_cycle = game.width % 2 == 0 or game.height % 2 == 0
+        self.hamilton_length = int(self.num_cells * hamilton_threshold)
+        self.search_budget = search_budget
+        self.budget = search_budget
+        self.seen = array('I', bytes(4 * self.num_cells))
+        self.parent = array('I', bytes(4 * self.num_cells))
+        self.dist = array('I', bytes(4 * self.num_cells))
+        self.stamp = 0
+        self.truncated = False
+        self.path = deque()
+        self.path_food = None
+        self.cycle_run = 0
+        self.stall_limit = 2 * self.num_cells
+        self.stall = 0
+        self.last_length = 0
+
+    def cell(self, position):
+        return position[1] * self.width + position[0]
+
+    def neighbors(self, cell):
+        # 按 DIRECTIONS 顺序的 4 个邻居（边界回绕，和 Snake.move 一致）
+        width, num_cells = self.width, self.num_cells
+        x = cell % width
+        row = cell - x
+        return ((cell - width) % num_cells, (cell + width) % num_cells,
+                row + (x - 1) % width, row + (x + 1) % width)
+
+    def cycle_next(self, cell):
+        return cycle_next(cell, self.width, self.height)
+
+    def direction(self, cell, nxt):
+        return DIRECTIONS[self.neighbors(cell).index(nxt)]
+
+    def search(self, start, goal, occupied, direct=True):
+        """A* 最短路，goal 即使被占用也可以作为终点；返回从第一步到 goal 的格子列表。
+
+        direct=False 时不允许第一步就走到 goal。用完这一步剩下的预算就放弃，返回 None 并把
+        truncated 设为 True。
+        """
+        self.stamp += 1
+        self.truncated = False
+        stamp, seen, parent, dist = self.stamp, self.seen, self.parent, self.dist
+        width, height, num_cells = self.width, self.height, self.num_cells
+        gx, gy = goal % width, goal // width
+        budget = self.budget
+        seen[start] = stamp
+        dist[start] = 0
+        # 每走一步估值（步数 + 到 goal 的环形曼哈顿距离）只会不变或变大，按估值分层，
+        # levels[k] 里是估值比起点大 k 的格子；同一层后进先出，先展开走得远的
+        dx, dy = abs(start % width - gx), abs(start // width - gy)
+        base = min(dx, width - dx) + min(dy, height - dy)
+        levels = [[(0, start)]]
+        k = 0
+        while k < len(levels):
+            level = levels[k]
+            if not level:
+                k += 1
+                continue
+            g, cell = level.pop()
+            if g != dist[cell]:
+                continue
+            if budget == 0:
+                self.budget = 0
+                self.truncated = True
+                return None
+            budget -= 1
+            g += 1
+            x = cell % width
+            row = cell - x
+            for nxt in ((cell - width) % num_cells, (cell + width) % num_cells,
+                        row + (x - 1) % width, row + (x + 1) % width):
+                if nxt == goal:
+                    if cell == start and not direct:
+                        continue
+                    # 估值是一致的，第一次碰到 goal 时的路就是最短的
+                    self.budget = budget
+                    parent[nxt] = cell
+                    path = [goal]
+                    while parent[path[-1]] != start:
+                        path.append(parent[path[-1]])
+                    path.reverse()
+                    return path
+                if occupied[nxt] or (seen[nxt] == stamp and dist[nxt] <= g):
+                    continue
+                seen[nxt] = stamp
+                dist[nxt] = g
+                parent[nxt] = cell
+                dx, dy = abs(nxt % width - gx), abs(nxt // width - gy)
+                f = g + min(dx, width - dx) + min(dy, height - dy) - base
+                while len(levels) <= f:
+                    levels.append([])
+                levels[f].append((g, nxt))
+        self.budget = budget
+        return None
+
+    def distances(self, source, occupied, targets):
+        # 从 source 出发到各空格子的步数，seen[c] == stamp 表示可达；targets 都找到或用完预算就停
+        self.stamp += 1
+        stamp, seen, dist = self.stamp, self.seen, self.dist
+        left = len(targets)
+        seen[source] = stamp
+        dist[source] = 0
+        queue = deque([source])
+        while queue and left and self.budget:
+            cell = queue.popleft()
+            self.budget -= 1
+            for nxt in self.neighbors(cell):
+                if seen[nxt] != stamp and not occupied[nxt]:
+                    seen[nxt] = stamp
+                    dist[nxt] = dist[cell] + 1
+                    queue.append(nxt)
+                    if nxt in targets:
+                        left -= 1
+        return stamp
+
+    def safe_after(self, path, grows):
+        """模拟沿 path 走完（grows 表示终点有食物），检查新蛇头之后还能走到新蛇尾。
+
+        Snake.move 先判断碰撞再去掉蛇尾，走进当前的蛇尾格会死；还在长身体时蛇尾要过几步
+        才腾出来。所以到蛇尾的路至少要 need 步，最短路不够长时保守地当作不安全。
+        直接在 snake.occupied 上改，查完再恢复，不复制整张占用表。
+        """
+        snake = self.game.snake
+        positions = snake.positions
+        occupied = snake.occupied
+        # 吃到食物是在最后一步移动之后才加长，所以走 path 时用原来的 grow_to
+        length = min(len(positions) + len(path), max(snake.grow_to, len(positions)))
+        grow_to = snake.grow_to + (1 if grows else 0)
+        if length < 2:
+            return True
+        kept = max(0, length - len(path))
+        walked = path[len(path) - (length - kept):]
+        dropped = [self.cell(positions[-1 - i]) for i in range(len(positions) - kept)]
+        tail = self.cell(positions[kept - 1]) if kept else walked[0]
+        # 去蛇尾的路上吃到食物会让蛇尾晚一步腾出来，所以没吃的食物也当作障碍
+        food = self.cell(self.game.food.position)
+        blocked = walked if grows or food in walked else walked + [food]
+        for cell in blocked:
+            occupied[cell] = 1
+        for cell in dropped:
+            occupied[cell] = 0
+        try:
+            route = self.search(path[-1], tail, occupied, direct=False)
+        finally:
+            for cell in dropped:
+                occupied[cell] = 1
+            for cell in blocked:
+                occupied[cell] = 0
+        if route is None:
+            return self.truncated
+        need = grow_to - length + 2
+        return len(route) >= need
+
+    def cycle_entry_safe(self):
+        """从现在起一直沿回路走，能否在 len(positions) 步内让整条蛇都排到回路上。
+
+        逐步模拟：回路上的下一格要么是空的，要么是在这一步之前已经被去掉的蛇尾
+        （Snake.move 先判断碰撞再去掉蛇尾），途中吃到当前的食物会让蛇尾晚一步缩回。
+        之后再刷出的食物无法预知，所以每一步都重新检查。
+        """
+        snake = self.game.snake
+        positions = snake.positions
+        length = len(positions)
+        index = {self.cell(p): i for i, p in enumerate(positions)}
+        food = self.cell(self.game.food.position)
+        grow_to = snake.grow_to
+        size = length
+        popped = 0
+        cell = self.cell(positions[0])
+        for _ in range(length):
+            cell = self.cycle_next(cell)
+            i = index.get(cell)
+            if i is not None and i < length - popped:
+                return False
+            size += 1
+            if size > grow_to:
+                size -= 1
+                popped += 1
+            if cell == food:
+                grow_to += 1
+        return True
+
+    def on_cycle(self):
+        # 整条蛇是否正好排在哈密顿回路上（从蛇尾到蛇头依次是回路上的下一格）
+        nxt = None
+        for position in self.game.snake.positions:
+            cell = self.cell(position)
+            if nxt is not None and self.cycle_next(cell) != nxt:
+                return False
+            nxt = cell
+        return True
+
+    def chase_tail(self, head, occupied):
+        snake = self.game.snake
+        tail = self.cell(snake.positions[-1])
+        moves = [nxt for nxt in self.neighbors(head) if not occupied[nxt]]
+        if not moves:
+            return snake.direction
+        stamp = self.distances(tail, occupied, set(moves))
+        dist, seen = self.dist, self.seen
+        # 离蛇尾最远的先试，优先选走完仍然安全的格子
+        moves.sort(key=lambda nxt: dist[nxt] if seen[nxt] == stamp else -1, reverse=True)
+        for nxt in moves:
+            if self.safe_after([nxt], nxt == self.cell(self.game.food.position)):
+                return self.direction(head, nxt)
+        return self.direction(head, moves[0])
+
+    def next_direction(self):
+        game = self.game
+        snake = game.snake
+        occupied = snake.occupied
+        head = self.cell(snake.get_head_position())
+        if snake.grow_to != self.last_length:
+            self.last_length = snake.grow_to
+            self.stall = 0
+        self.stall += 1
+        self.budget = self.search_budget
+
+        # 蛇很长时沿哈密顿回路走
+        if self.has_cycle and len(snake.positions) >= self.hamilton_length:
+            if self.cycle_run == 0 and self.on_cycle():
+                self.cycle_run = len(snake.positions)
+            nxt = self.cycle_next(head)
+            if not occupied[nxt] and (self.cycle_run >= len(snake.positions) or self.cycle_entry_safe()
+                                      or self.safe_after([nxt], nxt == self.cell(game.food.position))):
+                self.cycle_run += 1
+                self.path.clear()
+                return self.direction(head, nxt)
+        self.cycle_run = 0
+
+        # 食物没动且路径的下一格仍然可走，继续沿旧路径
+        food = self.cell(game.food.position)
+        if self.path and self.path_food == food:
+            nxt = self.path[0]
+            if nxt in self.neighbors(head) and not occupied[nxt]:
+                self.path.popleft()
+                return self.direction(head, nxt)
+
+        path = self.search(head, food, occupied)
+        if path is not None and (self.stall > self.stall_limit or self.safe_after(path, True)):
+            self.path = deque(path)
+            self.path_food = food
+            return self.direction(head, self.path.popleft())
+
+        self.path.clear()
+        return self.chase_tail(head, occupied)
+
+def place_snake(game, length):
+    # 沿哈密顿回路把蛇拉到指定长度，用于基准测试
+    snake = game.snake
+    snake.grow_to = length
+    while len(snake.positions) < length:
+        x, y = snake.get_head_position()
+        nx, ny = cycle_step(x, y, game.width, game.height)
+        snake.direction = (nx - x, ny - y)
+        if not snake.move():
+            raise RuntimeError("无法放置这么长的蛇")
+    game.food.randomize_position()
+
+if __name__ == "__main__":
+    # 规划延迟：不同棋盘大小和蛇长下，创建 Autopilot 和每步 next_direction() 的耗时；
+    # 1000、2000 是 snake4.py --world 的大地图
+    ticks = 300
+    cases = [(size, max(3, int(size * size * fraction))) for size in (20, 40, 80) for fraction in (0.0, 0.25, 0.6)]
+    cases += [(size, length) for size in (1000, 2000) for length in (3, 5000)]
+    for size, length in cases:
+        game = SnakeGame(size, size, random.Random(0))
+        game.reset(0)
+        place_snake(game, length)
+        start = time.perf_counter()
+        pilot = Autopilot(game)
+        setup = time.perf_counter() - start
+        samples = []
+        for _ in range(ticks):
+            start = time.perf_counter_ns()
+            direction = pilot.next_direction()
+            samples.append(time.perf_counter_ns() - start)
+            game.step(direction)
+            if game.game_over:
+                break
+        samples.sort()
+        mean = sum(samples) / len(samples)
+        p99 = samples[min(len(samples) - 1, len(samples) * 99 // 100)]
+        print(f"{size:4d}x{size:<4d} 长度 {length:5d}: 创建 {setup * 1e3:6.1f} ms, 平均 {mean / 1e3:8.1f} us, "
+              f"p99 {p99 / 1e3:8.1f} us, 最慢 {samples[-1] / 1e3:8.1f} us{'  (中途死亡)' if game.game_over else ''}")
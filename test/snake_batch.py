@@ -0,0 +1,233 @@
+import time
+
+import numpy as np
+
+from snake_core import (GRID_WIDTH, GRID_HEIGHT, FOOD_SCORE, SPECIAL_FOOD_SCORE,
+                        SPECIAL_FOOD_CHANCE, SPECIAL_FOOD_DURATION, S_SHAPE_COOLDOWN,
+                        DIRECTIONS, ShapeDetector)
+
+# 方向编号与 snake_core.DIRECTIONS 的顺序一致: 上、下、左、右
+DX = np.array([d[0] for d in DIRECTIONS], dtype=np.int64)
+DY = np.array([d[1] for d in DIRECTIONS], dtype=np.int64)
+OPPOSITE = np.array([DIRECTIONS.index((-d[0], -d[1])) for d in DIRECTIONS], dtype=np.int64)
+NO_TURN = -1
+
+# observe() 网格中的取值
+EMPTY, BODY, HEAD, FOOD, SPECIAL = range(5)
+
+class BatchSnakeEngine:
+    """同时推进 num_games 局互不相关的游戏，规则与 snake_core.SnakeGame 相同。
+
+    所有状态都放在 NumPy 数组里，格子用 y * width + x 编号。
+    蛇身是长度为 width * height 的环形缓冲区，head 指向蛇头所在槽位。
+    free_cells/free_index/num_free 是每局的空格子索引，放食物时 O(1) 均匀抽样。
+    撞到自己或占满棋盘的局会立即重新开始，并在 step() 返回的 dones 中标记，
+    占满棋盘的局同时在 wins 中标记。
+    形状奖励直接复用 snake_core.ShapeDetector 的查找表，move_code 是每局最近移动的编码。
+    """
+    def __init__(self, num_games, width=GRID_WIDTH, height=GRID_HEIGHT, seed=None):
+        self.num_games = num_games
+        self.width = width
+        self.height = height
+        self.num_cells = width * height
+        self.rng = np.random.default_rng(seed)
+        self.tick = 0
+
+        n, cells = num_games, self.num_cells
+        self.body = np.zeros((n, cells), dtype=np.int32)
+        self.occupied = np.zeros((n, cells), dtype=bool)
+        self.free_cells = np.zeros((n, cells), dtype=np.int64)
+        self.free_index = np.zeros((n, cells), dtype=np.int64)
+        self.num_free = np.zeros(n, dtype=np.int64)
+        self.wins = np.zeros(n, dtype=bool)
+        self.head = np.zeros(n, dtype=np.int64)
+        self.length = np.zeros(n, dtype=np.int64)
+        self.grow_to = np.zeros(n, dtype=np.int64)
+        self.direction = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.food = np.zeros(n, dtype=np.int64)
+        self.special = np.zeros(n, dtype=np.int64)
+        self.special_active = np.zeros(n, dtype=bool)
+        self.special_spawn = np.zeros(n, dtype=np.int64)
+
+        detector = ShapeDetector()
+        self.shape_tables = [(length, mask, np.frombuffer(bytes(table), dtype=np.uint8))
+                             for length, mask, table in detector.tables]
+        self.shape_mask = detector.mask
+        self.shape_max_length = detector.max_length
+        self.shape_lengths = np.array([0] + [len(moves) for _, moves, _ in detector.shapes], dtype=np.int64)
+        self.shape_scores = np.array([0] + [score for _, _, score in detector.shapes], dtype=np.int64)
+        self.move_code = np.zeros(n, dtype=np.int64)
+        self.move_count = np.zeros(n, dtype=np.int64)
+        self.shape_available = np.zeros(n, dtype=bool)
+        self.shape_timer = np.zeros(n, dtype=np.int64)
+        self.reset()
+
+    def reset(self, games=None):
+        if games is None:
+            games = np.arange(self.num_games)
+        if len(games) == 0:
+            return
+        start = (self.height // 2) * self.width + self.width // 2
+        self.occupied[games] = False
+        self.free_cells[games] = np.arange(self.num_cells)
+        self.free_index[games] = np.arange(self.num_cells)
+        self.num_free[games] = self.num_cells
+        self.body[games, 0] = start
+        self.occupied[games, start] = True
+        self._remove_free(games, np.full(len(games), start))
+        self.head[games] = 0
+        self.length[games] = 1
+        self.grow_to[games] = 3
+        self.direction[games] = self.rng.integers(len(DIRECTIONS), size=len(games))
+        self.score[games] = 0
+        self.special_active[games] = False
+        self.move_code[games] = 0
+        self.move_count[games] = 0
+        self.shape_available[games] = True
+        self.food[games] = self._sample_free(games)
+
+    def heads(self):
+        return self.body[np.arange(self.num_games), self.head]
+
+    def observe(self, out=None, games=None):
+        """把每局棋盘写成 (num_games, height, width) 的 uint8 网格，可以直接写进 out。
+        给了 games 时只画这几局，out 的第 i 行对应 games[i]"""
+        occupied = self.occupied if games is None else self.occupied[games]
+        if games is None:
+            games = np.arange(self.num_games)
+        count = len(games)
+        if out is None:
+            out = np.empty((count, self.height, self.width), dtype=np.uint8)
+        rows = np.arange(count)
+        flat = out.reshape(count, self.num_cells)
+        np.multiply(occupied, BODY, out=flat, casting="unsafe")
+        food = self.food[games]
+        placed = food >= 0  # 占满棋盘的局没有食物
+        flat[rows[placed], food[placed]] = FOOD
+        active = self.special_active[games]
+        flat[rows[active], self.special[games[active]]] = SPECIAL
+        flat[rows, self.body[games, self.head[games]]] = HEAD
+        return out
+
+    def _remove_free(self, games, cells):
+        # 每局最多删一个格子：把最后一个空格子换到被删的位置上
+        i = self.free_index[games, cells]
+        last = self.free_cells[games, self.num_free[games] - 1]
+        self.free_cells[games, i] = last
+        self.free_index[games, last] = i
+        self.free_index[games, cells] = -1
+        self.num_free[games] -= 1
+
+    def _add_free(self, games, cells):
+        self.free_cells[games, self.num_free[games]] = cells
+        self.free_index[games, cells] = self.num_free[games]
+        self.num_free[games] += 1
+
+    def _sample_free(self, games):
+        # 没有空格子的局返回 -1
+        num_free = self.num_free[games]
+        i = (self.rng.random(len(games)) * num_free).astype(np.int64)
+        cells = self.free_cells[games, np.minimum(i, np.maximum(num_free - 1, 0))]
+        return np.where(num_free > 0, cells, -1)
+
+    def step(self, actions, terminal_obs=None):
+        """actions: 每局的方向编号(0-3)，NO_TURN 表示保持方向。返回 (rewards, dones)。
+
+        结束的局会立即重新开始；给了 terminal_obs（形状同 observe() 的输出）时，
+        先把这些局结束时的棋盘写进对应的行。
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        games = np.arange(self.num_games)
+        self.tick += 1
+
+        # 转向，不能直接掉头
+        turn = (actions >= 0) & (actions != OPPOSITE[self.direction])
+        self.direction[turn] = actions[turn]
+
+        # 形状奖励冷却结束
+        ready = ~self.shape_available & (self.tick - self.shape_timer > S_SHAPE_COOLDOWN)
+        self.shape_available[ready] = True
+
+        # 更新特殊食物
+        expired = self.special_active & (self.tick - self.special_spawn > SPECIAL_FOOD_DURATION)
+        self.special_active[expired] = False
+        spawn = ~self.special_active & (self.rng.random(self.num_games) < SPECIAL_FOOD_CHANCE)
+        spawned = games[spawn]
+        self.special[spawned] = self._sample_free(spawned)
+        spawned = spawned[self.special[spawned] >= 0]
+        self.special_active[spawned] = True
+        self.special_spawn[spawned] = self.tick
+
+        # 移动
+        old_score = self.score.copy()
+        head_cell = self.body[games, self.head]
+        new_x = (head_cell % self.width + DX[self.direction]) % self.width
+        new_y = (head_cell // self.width + DY[self.direction]) % self.height
+        new_cell = new_y * self.width + new_x
+        dones = self.occupied[games, new_cell]
+
+        live = games[~dones]
+        cells = new_cell[live]
+        slot = (self.head[live] + 1) % self.num_cells
+        self.body[live, slot] = cells
+        self.occupied[live, cells] = True
+        self._remove_free(live, cells)
+        self.head[live] = slot
+        self.length[live] += 1
+
+        shrink = live[self.length[live] > self.grow_to[live]]
+        tail_slot = (self.head[shrink] - self.length[shrink] + 1) % self.num_cells
+        tail_cells = self.body[shrink, tail_slot]
+        self.occupied[shrink, tail_cells] = False
+        self._add_free(shrink, tail_cells)
+        self.length[shrink] -= 1
+
+        # 形状奖励，长的形状优先匹配
+        code = ((self.move_code[live] << 2) | self.direction[live]) & self.shape_mask
+        self.move_code[live] = code
+        count = np.minimum(self.move_count[live] + 1, self.shape_max_length)
+        self.move_count[live] = count
+        hit = np.zeros(len(live), dtype=np.int64)
+        for length, mask, table in self.shape_tables:
+            hit = np.where(hit == 0, table[code & mask] * (count >= length), hit)
+        claim = (hit > 0) & self.shape_available[live] & (self.length[live] > self.shape_lengths[hit])
+        claimed = live[claim]
+        self.score[claimed] += self.shape_scores[hit[claim]]
+        self.shape_available[claimed] = False
+        self.shape_timer[claimed] = self.tick
+
+        # 吃到普通食物
+        ate = live[cells == self.food[live]]
+        self.grow_to[ate] += 1
+        self.score[ate] += FOOD_SCORE
+        self.food[ate] = self._sample_free(ate)
+        # 没有空格子放食物：蛇占满了棋盘
+        self.wins[:] = False
+        self.wins[ate[self.food[ate] < 0]] = True
+
+        # 吃到特殊食物
+        ate_special = live[self.special_active[live] & (cells == self.special[live])]
+        self.score[ate_special] += SPECIAL_FOOD_SCORE
+        self.special_active[ate_special] = False
+
+        rewards = self.score - old_score
+        dones |= self.wins
+        finished = games[dones]
+        if terminal_obs is not None and len(finished):
+            terminal_obs[finished] = self.observe(games=finished)
+        self.reset(finished)
+        return rewards, dones
+
+if __name__ == "__main__":
+    # 吞吐量测试：随机动作，统计每秒推进的游戏步数
+    for num_games in (1, 64, 1024, 8192):
+        engine = BatchSnakeEngine(num_games, seed=0)
+        rng = np.random.default_rng(1)
+        steps = 200
+        actions = rng.integers(NO_TURN, len(DIRECTIONS), size=(steps, num_games))
+        start = time.perf_counter()
+        for t in range(steps):
+            engine.step(actions[t])
+        elapsed = time.perf_counter() - start
+        print(f"{num_games:5d} games: {steps * num_games / elapsed:14,.0f} ticks/s")
@@ -0,0 +1,419 @@
+import random
+from collections import deque
+
+# 游戏常量（与 snake4 的默认窗口一致）
+GRID_WIDTH = 30
+GRID_HEIGHT = 30
+
+# 逻辑时钟：以游戏步数计时，按原先默认的每秒 10 步换算
+TICK_RATE = 10
+FOOD_SCORE = 10
+SPECIAL_FOOD_SCORE = 50
+SPECIAL_FOOD_CHANCE = 0.01  # 1%的几率每步尝试生成
+SPECIAL_FOOD_DURATION = 10 * TICK_RATE  # 10秒
+S_SHAPE_SCORE = 100
+S_SHAPE_COOLDOWN = 3 * TICK_RATE  # 3秒后重置
+TURN_QUEUE_SIZE = 3  # 一步之内最多缓存几次转向
+
+# 方向常量
+UP = (0, -1)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+DIRECTIONS = [UP, DOWN, LEFT, RIGHT]
+DIRECTION_INDEX = {d: i for i, d in enumerate(DIRECTIONS)}
+
+# 形状奖励：(名字, 按时间顺序的移动方向, 奖励分数)，旋转和镜像会自动加入
+SHAPE_BONUSES = [
+    ("S", [RIGHT, RIGHT, DOWN, DOWN, LEFT, LEFT], S_SHAPE_SCORE),
+]
+
+# step() 返回的事件
+EVENT_FOOD = "food"
+EVENT_SPECIAL = "special"
+EVENT_DEAD = "dead"
+EVENT_WIN = "win"
+
+class TickClock:
+    """逻辑时钟，代替 pygame.time.get_ticks()，只在游戏前进时走动"""
+    def __init__(self):
+        self.ticks = 0
+
+    def advance(self, n=1):
+        self.ticks += n
+
+    def get_ticks(self):
+        return self.ticks
+
+class FreeCells:
+    """未被蛇身占用的格子编号集合，增删和均匀随机抽样都是 O(1)。
+
+    概念上是列表 cells（前 size 项是空格子）和 index（index[c] 是格子 c 在 cells 中的位置，
+    -1 表示被占用），初始都等于 range(num_cells)。字典里只存和初始值不同的项，所以 reset()
+    的代价只和上次重置以来改动过的格子数有关，与地图大小无关；重置后的状态和新建的完全一样，
+    同一个种子抽到的格子也一样。
+    """
+    def __init__(self, num_cells):
+        self.num_cells = num_cells
+        self.cells = {}
+        self.index = {}
+        self.size = num_cells
+
+    def reset(self):
+        self.cells.clear()
+        self.index.clear()
+        self.size = self.num_cells
+
+    def __len__(self):
+        return self.size
+
+    def remove(self, cell):
+        cells, index = self.cells, self.index
+        i = index.get(cell, cell)
+        self.size -= 1
+        last = cells.pop(self.size, self.size)
+        if last != cell:
+            cells[i] = last
+            index[last] = i
+        index[cell] = -1
+
+    def add(self, cell):
+        self.index[cell] = self.size
+        self.cells[self.size] = cell
+        self.size += 1
+
+    def sample(self, rng):
+        # 没有空格子时返回 None
+        if not self.size:
+            return None
+        i = rng.randrange(self.size)
+        return self.cells.get(i, i)
+
+def shape_variants(moves):
+    # 4 个旋转方向，各自再做左右镜像
+    variants = set()
+    for mirror in (False, True):
+        current = [(-x, y) for x, y in moves] if mirror else list(moves)
+        for _ in range(4):
+            variants.add(tuple(current))
+            current = [(-y, x) for x, y in current]
+    return variants
+
+def encode_moves(moves):
+    code = 0
+    for move in moves:
+        code = (code << 2) | DIRECTION_INDEX[move]
+    return code
+
+class ShapeDetector:
+    """根据最近的移动方向识别形状奖励。
+
+    最近的移动编码成一个滑动的 4 进制数（每个方向 2 位），每种长度的形状对应一张
+    4 ** 长度 的查找表，所以每步只需一次移位和几次查表，不分配内存。
+    """
+    def __init__(self, shapes=SHAPE_BONUSES):
+        self.shapes = shapes
+        tables = {}
+        for index, (name, moves, score) in enumerate(shapes):
+            table = tables.setdefault(len(moves), bytearray(4 ** len(moves)))
+            for variant in shape_variants(moves):
+                table[encode_moves(variant)] = index + 1
+        # 长的形状优先匹配
+        self.tables = [(length, 4 ** length - 1, tables[length]) for length in sorted(tables, reverse=True)]
+        self.max_length = self.tables[0][0] if self.tables else 0
+        self.mask = 4 ** self.max_length - 1
+        self.reset()
+
+    def reset(self):
+        self.code = 0
+        self.count = 0
+
+    def push(self, direction):
+        # 记录一步移动，返回刚刚完成的形状 (名字, 方向, 分数)，没有则返回 None
+        self.code = ((self.code << 2) | DIRECTION_INDEX[direction]) & self.mask
+        if self.count < self.max_length:
+            self.count += 1
+        for length, mask, table in self.tables:
+            if self.count >= length:
+                hit = table[self.code & mask]
+                if hit:
+                    return self.shapes[hit - 1]
+        return None
+
+class SpatialBuckets:
+    """把蛇身格子按 size x size 的区块分组，大地图只需查看视口覆盖的区块"""
+    def __init__(self, size, width, height):
+        self.size = size
+        self.width = width
+        self.height = height
+        self.buckets = {}
+
+    def clear(self):
+        self.buckets.clear()
+
+    def add(self, position):
+        key = (position[0] // self.size, position[1] // self.size)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = set()
+        bucket.add(position)
+
+    def remove(self, position):
+        key = (position[0] // self.size, position[1] // self.size)
+        bucket = self.buckets[key]
+        bucket.discard(position)
+        if not bucket:
+            del self.buckets[key]
+
+    def query(self, x, y, width, height):
+        # 与 [x, x + width) x [y, y + height) 相交的区块里的所有格子（边界回绕），调用方再精确筛选
+        size = self.size
+        columns = {((x + i) % self.width) // size for i in range(width)}
+        rows = {((y + j) % self.height) // size for j in range(height)}
+        for bx in columns:
+            for by in rows:
+                bucket = self.buckets.get((bx, by))
+                if bucket:
+                    yield from bucket
+
+class Snake:
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT, clock=None, rng=None, bucket_size=None):
+        self.width = width
+        self.height = height
+        self.clock = clock or TickClock()
+        self.rng = rng or random
+        self.free_cells = FreeCells(width * height)
+        # 蛇身用双端队列保存，occupied 是与之同步的占用表，碰撞检测 O(1)
+        self.positions = deque()
+        self.occupied = bytearray(width * height)
+        # 大地图渲染用的空间分区，默认不维护
+        self.buckets = SpatialBuckets(bucket_size, width, height) if bucket_size else None
+        self.shape_detector = ShapeDetector()
+        self.reset()
+
+    def reset(self):
+        self.length = 3
+        # 只清掉旧蛇身占的格子，不重建整张占用表，死亡重开的代价与地图大小无关
+        for position in self.positions:
+            self.occupied[self.cell(position)] = 0
+        self.free_cells.reset()
+        self.positions = deque([(self.width // 2, self.height // 2)])
+        self.occupied[self.cell(self.positions[0])] = 1
+        self.free_cells.remove(self.cell(self.positions[0]))
+        if self.buckets is not None:
+            self.buckets.clear()
+            self.buckets.add(self.positions[0])
+        self.direction = self.rng.choice(DIRECTIONS)
+        self.score = 0
+        self.grow_to = 3
+        self.s_shape_bonus_available = True
+        self.s_shape_bonus_claimed = False
+        self.s_shape_timer = 0
+        self.shape_detector.reset()
+
+    def get_head_position(self):
+        return self.positions[0]
+
+    def cell(self, position):
+        return position[1] * self.width + position[0]
+
+    def occupies(self, position):
+        return self.occupied[self.cell(position)] == 1
+
+    def turn(self, point):
+        if self.length > 1 and (point[0] * -1, point[1] * -1) == self.direction:
+            return
+        else:
+            self.direction = point
+
+    def move(self):
+        head = self.get_head_position()
+        x, y = self.direction
+        new_x = (head[0] + x) % self.width
+        new_y = (head[1] + y) % self.height
+        new_position = (new_x, new_y)
+        new_cell = new_y * self.width + new_x
+
+        if self.occupied[new_cell]:
+            self.reset()
+            return False
+
+        self.positions.appendleft(new_position)
+        self.occupied[new_cell] = 1
+        self.free_cells.remove(new_cell)
+        if self.buckets is not None:
+            self.buckets.add(new_position)
+
+        if len(self.positions) > self.grow_to:
+            tail = self.positions.pop()
+            tail_cell = self.cell(tail)
+            self.occupied[tail_cell] = 0
+            self.free_cells.add(tail_cell)
+            if self.buckets is not None:
+                self.buckets.remove(tail)
+
+        # 检查是否形成S形等形状，形状要完整地留在蛇身上
+        shape = self.shape_detector.push(self.direction)
+        if shape is not None and len(self.positions) > len(shape[1]):
+            self.claim_s_shape_bonus(shape[2])
+
+        return True
+
+    def claim_s_shape_bonus(self, score=S_SHAPE_SCORE):
+        if self.s_shape_bonus_available:
+            self.score += score  # S形奖励分数
+            self.s_shape_bonus_available = False
+            self.s_shape_bonus_claimed = True
+            self.s_shape_timer = self.clock.get_ticks()
+
+    def update_s_shape_status(self):
+        current_time = self.clock.get_ticks()
+        if self.s_shape_bonus_claimed and current_time - self.s_shape_timer > S_SHAPE_COOLDOWN:
+            self.s_shape_bonus_available = True
+            self.s_shape_bonus_claimed = False
+
+    def grow(self):
+        self.grow_to += 1
+        self.score += FOOD_SCORE
+
+class Food:
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT, rng=None, free_cells=None):
+        self.width = width
+        self.height = height
+        self.rng = rng or random
+        self.free_cells = free_cells
+        self.position = (0, 0)
+        self.randomize_position()
+
+    def randomize_position(self):
+        # 有空格子索引时只在空格子里抽样，棋盘已满返回 False
+        if self.free_cells is None:
+            self.position = (self.rng.randint(0, self.width - 1), self.rng.randint(0, self.height - 1))
+            return True
+        cell = self.free_cells.sample(self.rng)
+        if cell is None:
+            return False
+        self.position = (cell % self.width, cell // self.width)
+        return True
+
+class SpecialFood:
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT, clock=None, rng=None, free_cells=None):
+        self.width = width
+        self.height = height
+        self.clock = clock or TickClock()
+        self.rng = rng or random
+        self.free_cells = free_cells
+        self.position = (0, 0)
+        self.active = False
+        self.spawn_time = 0
+        self.duration = SPECIAL_FOOD_DURATION
+
+    def try_spawn(self):
+        if not self.active and self.rng.random() < SPECIAL_FOOD_CHANCE:
+            if self.free_cells is None:
+                self.position = (self.rng.randint(0, self.width - 1), self.rng.randint(0, self.height - 1))
+            else:
+                cell = self.free_cells.sample(self.rng)
+                if cell is None:
+                    return
+                self.position = (cell % self.width, cell // self.width)
+            self.active = True
+            self.spawn_time = self.clock.get_ticks()
+
+    def update(self):
+        if self.active:
+            current_time = self.clock.get_ticks()
+            if current_time - self.spawn_time > self.duration:
+                self.active = False
+
+class SnakeGame:
+    """一局完整的游戏逻辑，不依赖 pygame，每次 step() 前进一个逻辑步"""
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT, rng=None, bucket_size=None):
+        self.width = width
+        self.height = height
+        self.clock = TickClock()
+        self.rng = rng or random
+        self.snake = Snake(width, height, self.clock, self.rng, bucket_size)
+        self.food = Food(width, height, self.rng, self.snake.free_cells)
+        self.special_food = SpecialFood(width, height, self.clock, self.rng, self.snake.free_cells)
+        self.turn_queue = deque()
+        self.recorder = None
+        self.profiler = None
+        self.game_over = False
+        self.won = False
+        self.final_score = 0
+        self.final_length = 0
+
+    def reset(self, seed=None):
+        # 给定 seed 时重新播种，之后的整局游戏只由 seed 和转向决定
+        if seed is not None:
+            self.rng.seed(seed)
+        self.clock.ticks = 0
+        self.snake.reset()
+        self.food.randomize_position()
+        self.special_food.active = False
+        self.turn_queue.clear()
+        self.game_over = False
+        self.won = False
+
+    def queue_turn(self, direction):
+        # 按顺序缓存转向，每步取一个，快速连按两次不会丢失
+        last = self.turn_queue[-1] if self.turn_queue else self.snake.direction
+        if direction == last or direction == (-last[0], -last[1]):
+            return
+        if len(self.turn_queue) < TURN_QUEUE_SIZE:
+            self.turn_queue.append(direction)
+
+    def step(self, direction=None):
+        events = []
+        if self.game_over:
+            return events
+        self.clock.advance()
+        if direction is None and self.turn_queue:
+            direction = self.turn_queue.popleft()
+        if direction is not None:
+            self.snake.turn(direction)
+            if self.recorder is not None:
+                self.recorder.record(self.clock.get_ticks(), direction)
+
+        snake = self.snake
+        snake.update_s_shape_status()
+        self.special_food.update()
+        self.special_food.try_spawn()
+
+        # move() 撞到自己时会重置蛇，先记下最终成绩
+        score, length = snake.score, snake.grow_to
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.mark("logic")
+        moved = snake.move()
+        if profiler is not None:
+            profiler.mark("move")
+        if not moved:
+            self.game_over = True
+            self.final_score = score
+            self.final_length = length
+            events.append(EVENT_DEAD)
+            return events
+
+        head = snake.get_head_position()
+        if head == self.food.position:
+            snake.grow()
+            events.append(EVENT_FOOD)
+            # 食物只会出现在空格子上，没有空格子说明蛇占满了棋盘
+            placed = self.food.randomize_position()
+            if profiler is not None:
+                profiler.mark("food")
+            if not placed:
+                self.game_over = True
+                self.won = True
+                self.final_score = snake.score
+                self.final_length = len(snake.positions)  # grow_to 在吃完最后一个食物后多了 1
+                events.append(EVENT_WIN)
+                return events
+
+        if self.special_food.active and head == self.special_food.position:
+            snake.score += SPECIAL_FOOD_SCORE  # 特殊食物奖励
+            self.special_food.active = False
+            events.append(EVENT_SPECIAL)
+        return events
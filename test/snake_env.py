@@ -0,0 +1,190 @@
+import multiprocessing as mp
+import os
+import random
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from snake_core import GRID_WIDTH, GRID_HEIGHT, DIRECTIONS, SnakeGame
+from snake_batch import BatchSnakeEngine, BODY, HEAD, FOOD, SPECIAL
+
+class SnakeEnv:
+    """单局游戏的 reset/step 接口，规则就是 snake_core.SnakeGame。
+
+    动作是 DIRECTIONS 中的方向编号（None 表示不转向），观测是 (height, width) 的 uint8 网格，
+    取值见 snake_batch 的 EMPTY/BODY/HEAD/FOOD/SPECIAL，奖励是这一步的得分变化。
+    结束的那一步返回结束时的棋盘，之后需要调用 reset()。
+    """
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT, seed=None):
+        self.width = width
+        self.height = height
+        self.game = SnakeGame(width, height, random.Random())
+        self.seed = seed
+
+    def reset(self):
+        seed = self.seed
+        self.seed = None
+        self.game.reset(seed)
+        return self.observe()
+
+    def observe(self, positions=None):
+        # positions 是死亡时的蛇身：Snake.move 撞到自己后已经重置了蛇，只能按旧的蛇身重画
+        game = self.game
+        if positions is None:
+            positions = game.snake.positions
+            obs = np.frombuffer(game.snake.occupied, dtype=np.uint8).reshape(self.height, self.width) * BODY
+        else:
+            obs = np.zeros((self.height, self.width), dtype=np.uint8)
+            xs, ys = zip(*positions)
+            obs[list(ys), list(xs)] = BODY
+        x, y = game.food.position
+        obs[y, x] = FOOD
+        if game.special_food.active:
+            x, y = game.special_food.position
+            obs[y, x] = SPECIAL
+        x, y = positions[0]
+        obs[y, x] = HEAD
+        return obs
+
+    def step(self, action):
+        game = self.game
+        score = game.snake.score
+        positions = game.snake.positions  # Snake.reset 会换成新的 deque，这个保留着死亡时的蛇身
+        game.step(None if action is None else DIRECTIONS[action])
+        if game.game_over:
+            obs = self.observe(positions)
+            return obs, game.final_score - score, True, {"score": game.final_score, "won": game.won}
+        return self.observe(), game.snake.score - score, False, {"score": game.snake.score}
+
+def _attach(name, shape, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+def _worker(remote, buffers, start, stop, width, height, seed):
+    # 每个进程负责 [start, stop) 这一段游戏，直接读写共享内存，管道里只传命令
+    shms = []
+    arrays = {}
+    for key, (name, shape, dtype) in buffers.items():
+        shm, array = _attach(name, shape, dtype)
+        shms.append(shm)
+        arrays[key] = array[start:stop]
+    engine = BatchSnakeEngine(stop - start, width, height, seed)
+    try:
+        while True:
+            command = remote.recv()
+            if command == "step":
+                rewards, dones = engine.step(arrays["actions"], arrays["terminal_obs"])
+                arrays["rewards"][:] = rewards
+                arrays["dones"][:] = dones
+            elif command == "reset":
+                engine.reset()
+            elif command == "close":
+                break
+            engine.observe(arrays["obs"])
+            remote.send(None)
+    finally:
+        del arrays
+        for shm in shms:
+            shm.close()
+        remote.close()
+
+class SnakeVecEnv:
+    """把 num_envs 局游戏分给 num_workers 个进程，每个进程内部用 BatchSnakeEngine 成批推进。
+
+    观测、动作、奖励和结束标志都放在共享内存里，step() 不经过 pickle。
+    返回的数组就是共享内存本身，下一次 step() 会覆盖，需要保留请自行复制。
+    结束的局会自动重新开始，返回的 obs 已经是新一局；结束时的棋盘在 terminal_obs 的对应行里
+    （只有 dones 为 True 的行有意义）。
+    """
+    def __init__(self, num_envs, num_workers=None, width=GRID_WIDTH, height=GRID_HEIGHT, seed=None):
+        num_workers = min(num_workers or os.cpu_count(), num_envs)
+        self.num_envs = num_envs
+        self.num_workers = num_workers
+        self.width = width
+        self.height = height
+
+        specs = {
+            "obs": ((num_envs, height, width), np.uint8),
+            "terminal_obs": ((num_envs, height, width), np.uint8),
+            "actions": ((num_envs,), np.int64),
+            "rewards": ((num_envs,), np.int64),
+            "dones": ((num_envs,), np.bool_),
+        }
+        self.shms = []
+        buffers = {}
+        for key, (shape, dtype) in specs.items():
+            size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            shm = shared_memory.SharedMemory(create=True, size=size)
+            self.shms.append(shm)
+            buffers[key] = (shm.name, shape, dtype)
+            setattr(self, key, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+        self.actions[:] = -1
+
+        seeds = np.random.SeedSequence(seed).spawn(num_workers)
+        bounds = np.linspace(0, num_envs, num_workers + 1).astype(int)
+        self.remotes = []
+        self.processes = []
+        for i in range(num_workers):
+            remote, child = mp.Pipe()
+            process = mp.Process(target=_worker, daemon=True,
+                                 args=(child, buffers, bounds[i], bounds[i + 1], width, height, seeds[i]))
+            process.start()
+            child.close()
+            self.remotes.append(remote)
+            self.processes.append(process)
+        self.closed = False
+
+    def _broadcast(self, command):
+        for remote in self.remotes:
+            remote.send(command)
+        for remote in self.remotes:
+            remote.recv()
+
+    def reset(self):
+        self._broadcast("reset")
+        self.rewards[:] = 0
+        self.dones[:] = False
+        return self.obs
+
+    def step(self, actions):
+        # actions: 每局的方向编号，-1 表示不转向
+        self.actions[:] = actions
+        self._broadcast("step")
+        return self.obs, self.rewards, self.dones
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for remote in self.remotes:
+            remote.send("close")
+        for process in self.processes:
+            process.join()
+        for name in ("obs", "terminal_obs", "actions", "rewards", "dones"):
+            delattr(self, name)
+        for shm in self.shms:
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+if __name__ == "__main__":
+    # 吞吐量测试：固定总局数，增加进程数
+    num_envs = 4096
+    steps = 200
+    workers = sorted({1, 2, 4, os.cpu_count()})
+    rng = np.random.default_rng(0)
+    actions = rng.integers(-1, len(DIRECTIONS), size=(steps, num_envs))
+    for num_workers in workers:
+        with SnakeVecEnv(num_envs, num_workers, seed=0) as env:
+            env.reset()
+            start = time.perf_counter()
+            for t in range(steps):
+                env.step(actions[t])
+            elapsed = time.perf_counter() - start
+        print(f"{num_workers:3d} 进程: {steps * num_envs / elapsed:14,.0f} env steps/s")
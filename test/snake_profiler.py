@@ -0,0 +1,72 @@
+import csv
+import json
+from collections import deque
+from time import perf_counter_ns
+
+# snake4 主循环的各个阶段，按发生顺序排列
+PHASES = ["events", "logic", "move", "food", "hud", "draw", "update", "wait"]
+
+class FrameProfiler:
+    """按阶段累计每帧耗时（纳秒），保留最近 window 帧计算分位数。
+
+    mark(phase) 把上一次 mark 到现在的时间记到 phase 上；关闭时所有方法立即返回，
+    所以可以一直留在主循环里。
+    """
+    def __init__(self, phases=PHASES, window=300, enabled=False, keep_frames=False):
+        self.phases = list(phases)
+        self.index = {phase: i for i, phase in enumerate(self.phases)}
+        self.enabled = enabled
+        self.keep_frames = keep_frames
+        self.recent = deque(maxlen=window)
+        self.frames = []
+        self.current = [0] * len(self.phases)
+        self.last = perf_counter_ns()
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.current = [0] * len(self.phases)
+        self.last = perf_counter_ns()
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = perf_counter_ns()
+        self.current[self.index[phase]] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        self.recent.append(self.current)
+        if self.keep_frames:
+            self.frames.append(self.current)
+        self.current = [0] * len(self.phases)
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        # {阶段: [各分位数]}，单位纳秒，"total" 是整帧
+        if not self.recent:
+            return {}
+        columns = list(zip(*self.recent))
+        columns.append([sum(frame) for frame in self.recent])
+        result = {}
+        for phase, values in zip(self.phases + ["total"], columns):
+            values = sorted(values)
+            result[phase] = [values[min(len(values) - 1, len(values) * q // 100)] for q in quantiles]
+        return result
+
+    def summary_lines(self):
+        lines = ["阶段     p50/p95/p99 ms"]
+        for phase, (p50, p95, p99) in self.percentiles().items():
+            lines.append(f"{phase:7s} {p50 / 1e6:.2f}/{p95 / 1e6:.2f}/{p99 / 1e6:.2f}")
+        return lines
+
+    def dump(self, path):
+        # 按扩展名写 JSON 或 CSV，每帧一行
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump({"phases": self.phases, "frames": self.frames}, f)
+        else:
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(self.phases)
+                writer.writerows(self.frames)
@@ -0,0 +1,89 @@
+import random
+import struct
+import sys
+import time
+
+from snake_core import SnakeGame, DIRECTIONS, DIRECTION_INDEX
+
+# 回放文件格式（小端）:
+#   文件头  MAGIC, seed(u64), 宽(u16), 高(u16)
+#   转向    tick(u32), 方向编号(u8)
+#   结束    tick(u32), END(u8), 得分(i64), 长度(u32), 是否已结束(u8)
+MAGIC = b"SNK1"
+HEADER = struct.Struct("<4sQHH")
+EVENT = struct.Struct("<IB")
+FOOTER = struct.Struct("<qIB")
+END = 0xFF
+
+def new_seed():
+    return random.getrandbits(64)
+
+class ReplayRecorder:
+    """把一局游戏的种子和每次转向写进二进制日志"""
+    def __init__(self, path, game, seed):
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, seed, game.width, game.height))
+        self.game = game
+        game.reset(seed)
+        game.recorder = self
+
+    def record(self, tick, direction):
+        self.file.write(EVENT.pack(tick, DIRECTION_INDEX[direction]))
+
+    def close(self):
+        # 记下结束时的成绩，回放时用来校验
+        game = self.game
+        if game.game_over:
+            score, length = game.final_score, game.final_length
+        else:
+            score, length = game.snake.score, game.snake.grow_to
+        self.file.write(EVENT.pack(game.clock.get_ticks(), END))
+        self.file.write(FOOTER.pack(score, length, game.game_over))
+        self.file.close()
+        game.recorder = None
+
+def load_replay(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, seed, width, height = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} 不是回放文件")
+    events = []
+    offset = HEADER.size
+    while True:
+        tick, direction = EVENT.unpack_from(data, offset)
+        offset += EVENT.size
+        if direction == END:
+            score, length, game_over = FOOTER.unpack_from(data, offset)
+            return seed, width, height, events, (tick, score, length, bool(game_over))
+        events.append((tick, DIRECTIONS[direction]))
+
+def play_replay(path):
+    """不渲染、不限速地重放日志，返回 (游戏, 成绩是否与记录一致)"""
+    seed, width, height, events, (end_tick, score, length, game_over) = load_replay(path)
+    game = SnakeGame(width, height, random.Random())
+    game.reset(seed)
+    events = iter(events)
+    pending = next(events, None)
+    while game.clock.get_ticks() < end_tick and not game.game_over:
+        direction = None
+        if pending is not None and pending[0] == game.clock.get_ticks() + 1:
+            direction = pending[1]
+            pending = next(events, None)
+        game.step(direction)
+    if game_over:
+        ok = game.game_over and (game.final_score, game.final_length) == (score, length)
+    else:
+        ok = not game.game_over and (game.snake.score, game.snake.grow_to) == (score, length)
+    return game, ok
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("用法: python snake_replay.py 回放文件")
+    start = time.perf_counter()
+    game, ok = play_replay(sys.argv[1])
+    elapsed = time.perf_counter() - start
+    ticks = game.clock.get_ticks()
+    print(f"{ticks} 步, 用时 {elapsed * 1000:.1f} ms ({ticks / elapsed:,.0f} ticks/s)")
+    print("成绩一致" if ok else "成绩不一致!")
+    sys.exit(0 if ok else 1)
@@ -1,16 +1,24 @@
+import argparse
 import numpy as np
 import torch
-from torch.utils import data
 from d2l import torch as d2l
 
+from linreg_data import BatchIterator, evaluate
+from linreg_metrics import TrainingMetrics, trace
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--metrics", help="把每批、每轮的耗时写入 JSON 或 CSV 文件")
+parser.add_argument("--trace", help="用 torch.profiler 记录训练过程，导出 Chrome trace 文件")
+args = parser.parse_args()
+
 true_w = torch.tensor([2, -3.4])
 true_b = 4.2
 features, labels = d2l.synthetic_data(true_w, true_b, 1000)
 
 def load_array(data_arrays, batch_size, is_train=True):  #@save
     """构造一个PyTorch数据迭代器"""
-    dataset = data.TensorDataset(*data_arrays)
-    return data.DataLoader(dataset, batch_size, shuffle=is_train)
+    # 每个 epoch 打乱一次后按切片取批，不经过 TensorDataset/DataLoader
+    return BatchIterator(data_arrays, batch_size, shuffle=is_train)
 
 batch_size = 10
 data_iter = load_array((features, labels), batch_size)
@@ -29,14 +37,26 @@ loss = nn.MSELoss()
 
 trainer = torch.optim.SGD(net.parameters(), lr=0.03)
 num_epochs = 3
-for epoch in range(num_epochs):
-    for X, y in data_iter:
-        l = loss(net(X) ,y)
-        trainer.zero_grad()
-        l.backward()
-        trainer.step()
-    l = loss(net(features), labels)
-    print(f'epoch {epoch + 1}, loss {l:f}')
+# 记录取数据、前向、反向和参数更新各自的耗时
+metrics = TrainingMetrics()
+with trace(args.trace):
+    for epoch in range(num_epochs):
+        metrics.start_epoch()
+        for X, y in metrics.batches(data_iter):
+            l = loss(net(X) ,y)
+            metrics.mark("forward")
+            trainer.zero_grad()
+            l.backward()
+            metrics.mark("backward")
+            trainer.step()
+            metrics.mark("optimizer")
+            metrics.end_batch(len(X))
+        timing = metrics.end_epoch()
+        # 分块累加损失，数据再大也不需要一次算出全部预测
+        l = evaluate(net, loss, BatchIterator((features, labels), 10000, shuffle=False))
+        print(f'epoch {epoch + 1}, loss {l:f}, {metrics.summary(timing)}')
+if args.metrics:
+    metrics.dump(args.metrics)
 
 w = net[0].weight.data
 print('w的估计误差：', true_w - w.reshape(true_w.shape))
@@ -1,8 +1,11 @@
+import argparse
 import numpy as np
 import torch
 from torch import nn
 from d2l import torch as d2l
 
+from linreg_metrics import MetricsTrainer, trace
+
 class LinearRegression(d2l.Module):  #@save
     """The linear regression model implemented with high-level APIs."""
     def __init__(self, lr):
@@ -20,7 +23,17 @@ class LinearRegression(d2l.Module):  #@save
     def configure_optimizers(self):
        return torch.optim.SGD(self.parameters(), self.lr)
     
-model = LinearRegression(lr=0.03)
-data = d2l.SyntheticRegressionData(w=torch.tensor([2, -3.4]), b=4.2)
-trainer = d2l.Trainer(max_epochs=3)
-trainer.fit(model, data)
\ No newline at end of file
+if __name__ == "__main__":
+    # 其他脚本（如 linreg_stream.py）会导入 LinearRegression，不在导入时训练
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--metrics", help="把每批、每轮的耗时写入 JSON 或 CSV 文件")
+    parser.add_argument("--trace", help="用 torch.profiler 记录训练过程，导出 Chrome trace 文件")
+    args = parser.parse_args()
+
+    model = LinearRegression(lr=0.03)
+    data = d2l.SyntheticRegressionData(w=torch.tensor([2, -3.4]), b=4.2)
+    trainer = MetricsTrainer(max_epochs=3)
+    with trace(args.trace):
+        trainer.fit(model, data)
+    if args.metrics:
+        trainer.metrics.dump(args.metrics)
\ No newline at end of file
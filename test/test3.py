@@ -1,15 +1,33 @@
+import argparse
 import os
+import time
 from openai import OpenAI
 
+parser = argparse.ArgumentParser()
+parser.add_argument("--stream", action="store_true", help="流式请求：内容一到就打印，并报告首个 token 时间")
+args = parser.parse_args()
+
 client = OpenAI(api_key=os.environ.get('sk-fc721126a82846d3972b69642ffc97a2'), base_url="https://api.deepseek.com")
 
+start = time.perf_counter()
+first_token = None
 response = client.chat.completions.create(
     model="deepseek-chat",
     messages=[
         {"role": "system", "content": "You are a helpful assistant"},
         {"role": "user", "content": "Hello"},
     ],
-    stream=False
+    stream=args.stream
 )
 
-print(response.choices[0].message.content)
\ No newline at end of file
+if not args.stream:
+    print(response.choices[0].message.content)
+else:
+    for chunk in response:
+        if chunk.choices and chunk.choices[0].delta.content:
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            print(chunk.choices[0].delta.content, end="", flush=True)
+    print()
+    if first_token is not None:
+        print(f"首个 token {first_token * 1000:.0f} ms，总耗时 {(time.perf_counter() - start) * 1000:.0f} ms")
\ No newline at end of file